@@ -1,9 +1,6 @@
 import os
 from pathlib import Path
 
-from dotenv import load_dotenv
-from flask import Flask
-
 BASE_DIR = Path(__file__).resolve().parents[3]
 ENV_FILE = BASE_DIR / ".env"
 
@@ -17,9 +14,22 @@ def _env_flag(name: str, default: bool = False) -> bool:
 
 def create_app():
     """Create and configure the flask app."""
-    load_dotenv(ENV_FILE)
-    from backend.app.game_api import game_api
-    from backend.app.routes import auth_routes, limiter
+    from backend.app.startup import startup_profiler
+
+    with startup_profiler.phase("load .env"):
+        from dotenv import load_dotenv
+        load_dotenv(ENV_FILE)
+
+    with startup_profiler.phase("import flask"):
+        from flask import Flask
+
+    with startup_profiler.phase("import routes"):
+        from backend.app.game_api import game_api
+        from backend.app.routes import auth_routes, limiter
+
+    with startup_profiler.phase("load game data"):
+        from backend.game.game_data import get_game_data
+        get_game_data()
 
     debug_enabled = _env_flag("FLASK_DEBUG")
     is_production = os.getenv("VERCEL_ENV") == "production" or os.getenv("FLASK_ENV") == "production"
@@ -39,8 +49,9 @@ def create_app():
     )
     app.debug = debug_enabled
 
-    app.register_blueprint(auth_routes)
-    app.register_blueprint(game_api)
-    limiter.init_app(app)
+    with startup_profiler.phase("register blueprints"):
+        app.register_blueprint(auth_routes)
+        app.register_blueprint(game_api)
+        limiter.init_app(app)
 
     return app
@@ -1,5 +1,4 @@
-from backend.app.db import SUPABASE_ANON_KEY, SUPABASE_KEY_ROLE, SUPABASE_SECRET_KEY, supabase
-from werkzeug.security import generate_password_hash, check_password_hash
+from backend.app.db import SUPABASE_ANON_KEY, SUPABASE_KEY_ROLE, SUPABASE_SECRET_KEY, get_storage, run_concurrently
 import re
 
 
@@ -60,9 +59,16 @@ def create_account(username: str, email: str, password: str, confirm_password: s
         dict: A success message or an error message
     """
     try:
+        storage = get_storage()
+
+        # Look up the username and email at the same time
+        username_user, email_user = run_concurrently(
+            lambda: storage.get_user_by_username(username),
+            lambda: storage.get_user_by_email(email),
+        )
+
         # Check if username already 
-        response = supabase.table('users').select('*').eq('username', username).execute()
-        if response.data:
+        if username_user:
             return {'error': 'Username already exists', 'username': username, 'email': email}
         
         # Validate email
@@ -70,8 +76,7 @@ def create_account(username: str, email: str, password: str, confirm_password: s
             return {'error': 'Invalid email format', 'username': username, 'email': email}
         
         # Check if email already exists
-        response = supabase.table('users').select('*').eq('email', email).execute()
-        if response.data:
+        if email_user:
             return {'error': 'Email already in use', 'username': username, 'email': email}
         
         # Validate password
@@ -82,14 +87,12 @@ def create_account(username: str, email: str, password: str, confirm_password: s
             return {'error': 'Passwords do not match', 'username': username, 'email': email}
         
         # Hash the password and insert the new user
+        from werkzeug.security import generate_password_hash
+
         hashed_password = generate_password_hash(password)
-        response = supabase.table('users').insert({
-            'username': username,
-            'email': email,
-            'password' : hashed_password
-        }).execute()
+        created_user = storage.create_user(username, email, hashed_password)
 
-        if not response.data:
+        if not created_user:
             return {'error': 'Failed to create account', 'username': username, 'email': email}
         
         return {'success': 'Account created successfully'}
@@ -112,11 +115,12 @@ def login(username: str, password: str):
         dict: A success message or an error message
     """
     try:
-        response = supabase.table('users').select('*').eq('username', username).execute()
-        if not response.data:
+        user = get_storage().get_user_by_username(username)
+        if not user:
             return {'error': 'Invalid username or password'}
         
-        user = response.data[0]
+        from werkzeug.security import check_password_hash
+
         if not check_password_hash(user['password'], password):
             return {'error': 'Invalid username or password'}
         
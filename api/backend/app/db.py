@@ -1,15 +1,11 @@
 import os
 import json
 import base64
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
 
-from dotenv import load_dotenv
-from supabase import create_client
+from backend.app import BASE_DIR, ENV_FILE, _env_flag
 
-BASE_DIR = Path(__file__).resolve().parents[3]
-ENV_FILE = BASE_DIR / ".env"
-
-load_dotenv(ENV_FILE)
 
 def _decode_jwt_role(token: str | None) -> str | None:
     """Read the role claim from a Supabase JWT without verifying it."""
@@ -26,6 +22,9 @@ def _decode_jwt_role(token: str | None) -> str | None:
         return None
 
 
+# Settings are read at import, so .env must be loaded first; create_app() loads
+# it before importing anything that imports this module.
+
 # Supabase URL and Key
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -34,19 +33,102 @@ SUPABASE_ANON_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_KEY = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_SECRET_KEY or SUPABASE_ANON_KEY
 SUPABASE_KEY_ROLE = _decode_jwt_role(SUPABASE_KEY)
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError(
-        f"Supabase URL or Key is not set. Expected SUPABASE_URL plus one of "
-        f"SUPABASE_KEY, SUPABASE_SERVICE_ROLE_KEY, or SUPABASE_SECRET_KEY in {ENV_FILE}."
-    )
-
-# Create Supabase client
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as exc:
-    if str(exc) == "Invalid API key" and SUPABASE_KEY.startswith("sb_secret_"):
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(BASE_DIR / "dungeon_crawler.sqlite3"))
+# 'row' rewrites the room state deltas in the dungeons row on every save; 'rooms'
+# writes the dungeons row once per floor and each changed room to dungeon_rooms.
+DUNGEON_PERSISTENCE = os.getenv("DUNGEON_PERSISTENCE", "row").strip().lower()
+# 'sync' writes each save before the response; 'async' hands it to the
+# write-behind queue; 'async_flush' also waits for a save's queued writes
+# before it is next loaded.
+PERSISTENCE_MODE = os.getenv("PERSISTENCE_MODE", "sync").strip().lower()
+# EVENT_LOG appends each action to game_events and rewrites the player_saves
+# and dungeons rows only as a snapshot: for a new save or floor and every
+# SNAPSHOT_INTERVAL versions, dropping the events the snapshot covers.
+EVENT_LOG = _env_flag("EVENT_LOG")
+SNAPSHOT_INTERVAL = max(1, int(os.getenv("SNAPSHOT_INTERVAL", "50")))
+# Threads for run_concurrently(); 1 runs every query on the request thread.
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "8"))
+
+
+def create_supabase_client():
+    """Create a Supabase client from the configured URL and key."""
+    if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError(
-            "The installed supabase Python client does not support sb_secret keys. "
-            "Upgrade the 'supabase' package in api/requirements.txt and redeploy."
-        ) from exc
-    raise
+            f"Supabase URL or Key is not set. Expected SUPABASE_URL plus one of "
+            f"SUPABASE_KEY, SUPABASE_SERVICE_ROLE_KEY, or SUPABASE_SECRET_KEY in {ENV_FILE}."
+        )
+
+    # The supabase package pulls in httpx, postgrest, storage3 and friends, and
+    # dominates cold start time, so it is only imported when a client is needed.
+    from supabase import create_client
+
+    try:
+        return create_client(SUPABASE_URL, SUPABASE_KEY)
+    except Exception as exc:
+        if str(exc) == "Invalid API key" and SUPABASE_KEY.startswith("sb_secret_"):
+            raise ValueError(
+                "The installed supabase Python client does not support sb_secret keys. "
+                "Upgrade the 'supabase' package in api/requirements.txt and redeploy."
+            ) from exc
+        raise
+
+
+def create_storage(backend: str = STORAGE_BACKEND):
+    """
+    Create a storage backend by name.
+
+    Args:
+        backend (str): One of 'supabase', 'sqlite' or 'memory'.
+
+    Returns:
+        StorageBackend: The configured backend.
+    """
+    from backend.app.storage import MemoryStorage, SQLiteStorage, SupabaseStorage
+
+    if backend == "supabase":
+        return SupabaseStorage(create_supabase_client())
+    if backend == "sqlite":
+        return SQLiteStorage(SQLITE_PATH)
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'. Expected supabase, sqlite or memory.")
+
+
+@lru_cache(maxsize=None)
+def get_storage():
+    """Return the process-wide storage backend selected by STORAGE_BACKEND."""
+    return create_storage(STORAGE_BACKEND)
+
+
+@lru_cache(maxsize=None)
+def get_query_executor():
+    """Return the process-wide pool that runs independent storage queries."""
+    return ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix='db-query')
+
+
+def run_concurrently(*calls):
+    """
+    Run independent storage calls at the same time and gather their results.
+
+    Only backends with concurrent_queries set, whose queries are network round
+    trips, get a thread per call; the first call runs on the request thread.
+    Elsewhere the calls simply run in order.
+
+    Args:
+        calls: Zero-argument callables, such as lambdas around storage methods.
+
+    Returns:
+        list: Each call's result, in the order given. If calls raise, the
+              first one's exception is raised once every call has finished.
+    """
+    if len(calls) < 2 or QUERY_WORKERS <= 1 or not get_storage().concurrent_queries:
+        return [call() for call in calls]
+
+    futures = [get_query_executor().submit(call) for call in calls[1:]]
+    try:
+        first = calls[0]()
+    finally:
+        # Let the other queries finish before an error leaves the request.
+        wait(futures)
+    return [first, *(future.result() for future in futures)]
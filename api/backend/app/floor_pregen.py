@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.game.dungeon import Dungeon
+
+FLOOR_WIDTH = 10
+FLOOR_HEIGHT = 10
+FLOOR_ROOMS = 5
+MAX_PREPARED_FLOORS = 256  # Oldest prepared floors are dropped past this many
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='floor-pregen')
+_prepared = OrderedDict()  # (user_id, save_slot, floor_level) -> Future[Dungeon]
+_lock = threading.Lock()
+
+
+def generate_floor(floor_level: int):
+    """Generate a standard-sized floor."""
+    dungeon = Dungeon(width=FLOOR_WIDTH, height=FLOOR_HEIGHT, num_rooms=FLOOR_ROOMS, floor_level=floor_level)
+    dungeon.generate()
+    return dungeon
+
+
+def schedule_next_floor(user_id: int, save_slot: int, floor_level: int):
+    """Start generating a floor in the background unless one is already prepared for this save."""
+    key = (user_id, save_slot, floor_level)
+    with _lock:
+        if key in _prepared:
+            return
+
+        # A save only ever needs the floor below its current one.
+        for stale_key in [k for k in _prepared if k[:2] == key[:2]]:
+            _prepared.pop(stale_key).cancel()
+
+        _prepared[key] = _executor.submit(generate_floor, floor_level)
+        while len(_prepared) > MAX_PREPARED_FLOORS:
+            _, future = _prepared.popitem(last=False)
+            future.cancel()
+
+
+def take_next_floor(user_id: int, save_slot: int, floor_level: int):
+    """
+    Return the prepared floor for a save, generating it now if none is ready.
+
+    The floor is removed from the pool, so each prepared floor is used once.
+    """
+    with _lock:
+        future = _prepared.pop((user_id, save_slot, floor_level), None)
+
+    if future is not None and not future.cancelled():
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Error pre-generating floor {floor_level}: {e}")
+
+    return generate_floor(floor_level)
@@ -1,98 +1,142 @@
+import json
+
 from flask import redirect, render_template, session, url_for
 
-from backend.app.db import supabase
-from backend.game.enemy import Enemy
+from backend.app.db import DUNGEON_PERSISTENCE, EVENT_LOG, PERSISTENCE_MODE, SNAPSHOT_INTERVAL
+from backend.app.floor_pregen import schedule_next_floor, take_next_floor
+from backend.app.game_session import GameSession
+from backend.app.save_journal import get_save_journal, write_save
+from backend.app.session_cache import get_session_cache
+from backend.app.write_behind import PendingSave, get_write_behind
 from backend.game.merchant import Merchant
-
-ENEMY_FIELDS = {'name', 'health', 'max_health', 'defense', 'skills'}
-
-
-def get_player_save_id(user_id, save_slot):
-    response = supabase.table('player_saves').select('id').eq('user_id', user_id).eq('save_slot', save_slot).execute()
-    if not response.data:
-        return None
-    return response.data[0]['id']
-
-
-def persist_game_state(player, dungeon, user_id, save_slot):
-    player.save_player_data(user_id, save_slot)
-    player_save_id = get_player_save_id(user_id, save_slot)
-    if player_save_id is None:
+from backend.game.room_state import EnemyState
+
+
+def build_event_save(player, dungeon, user_id, save_slot, player_record, event, details):
+    """
+    Build the event log writes for a save: a game_events row holding the
+    action and what it changed, plus a snapshot of the whole game for a new
+    save or floor and every SNAPSHOT_INTERVAL versions.
+    """
+    version = player_record['version']
+    snapshot = not player.record_version or not dungeon.row_saved or version % SNAPSHOT_INTERVAL == 0
+    changes = {column: value for column, value in player_record.items()
+               if column not in ('user_id', 'save_slot', 'version', 'base_version')}
+    event_record = {
+        'user_id': user_id,
+        'save_slot': save_slot,
+        'version': version,
+        'event': event,
+        'details': json.dumps(details or {}),
+        'player': json.dumps(changes),
+        # A new floor's rooms are all in its snapshot.
+        'rooms': json.dumps(dungeon.to_room_records(user_id, save_slot) if dungeon.row_saved else []),
+    }
+
+    if snapshot:
+        player_record = dict(player.to_record(user_id, player_record['save_slot']), snapshot_version=version)
+        dungeon_record = dungeon.to_record(user_id, save_slot)
+    else:
+        player_record = player.version_record(user_id, player_record['save_slot'])
+        dungeon_record = None
+    return PendingSave(False, player_record, dungeon_record, event_records=[event_record])
+
+
+def persist_game_state(player, dungeon, user_id, save_slot, event='save', details=None):
+    """
+    Upsert the player save and its dungeon in a single atomic round trip.
+
+    Only the player columns that changed are sent, and nothing is written when
+    neither the player nor the dungeon changed. With DUNGEON_PERSISTENCE=rooms
+    the dungeons row is only written for a new floor; otherwise just the rooms
+    changed since the last save are written. With EVENT_LOG the save is
+    appended to game_events as event, with its details, instead. With
+    PERSISTENCE_MODE=async or async_flush the write is queued on the
+    write-behind pool and this returns at once. With SAVE_JOURNAL_PATH set, a write storage cannot take right now
+    is journaled locally and replayed later. A saved session is written
+    through to the session cache.
+    """
+    target_save_slot = player.save_slot if player.save_slot is not None else save_slot
+    player.save_slot = target_save_slot
+
+    try:
+        player_record = player.to_changes(user_id, target_save_slot)
+        if player_record is None and not dungeon.has_changes():
+            get_session_cache().put(GameSession(user_id, save_slot, player, dungeon))
+            return True
+
+        if player_record is None:
+            # Only the keys and version, so the save's version still moves on.
+            player_record = player.version_record(user_id, target_save_slot)
+
+        if EVENT_LOG:
+            pending_save = build_event_save(player, dungeon, user_id, save_slot, player_record, event, details)
+        elif DUNGEON_PERSISTENCE == 'rooms':
+            dungeon_record = None if dungeon.row_saved else dungeon.to_record(user_id, save_slot)
+            # A new floor's row already holds every room's state.
+            room_records = [] if dungeon_record else dungeon.to_room_records(user_id, save_slot)
+            pending_save = PendingSave(True, player_record, dungeon_record, room_records)
+        else:
+            dungeon_record = dungeon.to_record(user_id, save_slot) if dungeon.has_changes() else None
+            pending_save = PendingSave(False, player_record, dungeon_record)
+
+        def game_state():
+            # The whole game after this save, kept by the journal while storage is down.
+            return player.to_record(user_id, target_save_slot), dungeon.to_record(user_id, save_slot)
+
+        if PERSISTENCE_MODE in ('async', 'async_flush'):
+            if get_save_journal() is not None:
+                # Built now, while it matches this save: if the queued write
+                # fails, the journal serves loads from it.
+                pending_save.state = game_state()
+            get_write_behind().submit(user_id, save_slot, pending_save)
+        elif not write_save(user_id, save_slot, pending_save, game_state):
+            return False
+    except Exception as e:
+        print(f"Error saving game state: {e}")
         return False
-    dungeon.save_to_db(player_save_id=player_save_id, user_id=user_id, save_slot=save_slot)
+    player.mark_saved(player_record['version'])
+    dungeon.mark_saved()
+    get_session_cache().put(GameSession(user_id, save_slot, player, dungeon))
     return True
 
 
-def _normalize_room_state(room_state):
-    if not room_state or not isinstance(room_state, dict):
-        return {'enemy': None, 'merchant': None}
-
-    if 'enemy' in room_state or 'merchant' in room_state:
-        return {
-            'enemy': room_state.get('enemy'),
-            'merchant': room_state.get('merchant'),
-        }
-
-    if ENEMY_FIELDS.issubset(room_state.keys()):
-        return {'enemy': room_state, 'merchant': None}
-
-    return {'enemy': None, 'merchant': None}
-
-
-def set_room_state(dungeon, room_id, enemy=None, merchant=None):
-    room_state = {}
-    if enemy:
-        room_state['enemy'] = enemy
-    if merchant:
-        room_state['merchant'] = merchant
-    dungeon.room_enemies[str(room_id)] = room_state
-
-
 def build_enemy_for_room(dungeon, room_id):
-    room_state = _normalize_room_state(dungeon.room_enemies.get(str(room_id)))
-    room_enemy_data = room_state['enemy']
-    if not room_enemy_data:
+    enemy_state = dungeon.room_state(room_id).enemy
+    if not enemy_state:
         return None, None
 
-    enemy = Enemy(
-        name=room_enemy_data['name'],
-        health=room_enemy_data['health'],
-        max_health=room_enemy_data['max_health'],
-        defense=room_enemy_data['defense'],
-        skills=room_enemy_data['skills'],
-        dungeon=dungeon,
-        loot=room_enemy_data.get('loot')
-    )
-    enemy_description = dungeon.room_enemy_descriptions.get(str(room_id))
+    enemy = enemy_state.to_enemy(dungeon)
+    enemy_description = dungeon.get_enemy_description(room_id)
     return enemy, enemy_description
 
 
 def build_merchant_for_room(dungeon, room_id):
     room_id = str(room_id)
-    room_state = _normalize_room_state(dungeon.room_enemies.get(room_id))
-    merchant_data = room_state['merchant']
+    room_state = dungeon.room_state(room_id)
+    merchant_state = room_state.merchant
 
-    if not merchant_data and dungeon.merchant_location and str(dungeon.merchant_location[0]) == room_id:
+    if not merchant_state and dungeon.merchant_location and str(dungeon.merchant_location[0]) == room_id:
         merchant = Merchant(dungeon)
         merchant.generate_inventory(dungeon)
         description = merchant.load_description()
         merchant.description = description
-        merchant_data = merchant.to_state()
-        set_room_state(dungeon, room_id, enemy=room_state['enemy'], merchant=merchant_data)
+        merchant_state = merchant.to_state()
+        dungeon.set_room_state(room_id, enemy=room_state.enemy, merchant=merchant_state)
         if description:
-            dungeon.room_descriptions[room_id] = description
+            dungeon.set_room_description(room_id, description)
 
-    if not merchant_data:
+    if not merchant_state:
         return None, None
 
-    description = merchant_data.get('description') or dungeon.room_descriptions.get(room_id)
-    merchant = Merchant(
-        dungeon,
-        inventory=merchant_data.get('inventory', []),
-        gold_amount=merchant_data.get('gold_amount'),
-        description=description,
-    )
-    return merchant, description
+    merchant = Merchant.from_state(dungeon, merchant_state, merchant_state.description or dungeon.room_descriptions.get(room_id))
+    return merchant, merchant.description_text
+
+
+def prepare_next_floor_if_at_exit(player, dungeon, user_id, save_slot):
+    """Start generating the next floor in the background once the player reaches the exit."""
+    if dungeon.exit_location and str(player.player_location) == str(dungeon.exit_location[0]):
+        schedule_next_floor(user_id, save_slot, player.dungeon_floor + 1)
 
 
 def get_movement_actions(player, dungeon):
@@ -117,7 +161,7 @@ def get_movement_actions(player, dungeon):
 
 
 def get_skill_actions(player):
-    attack_bonus = player.get_attack_bonus()
+    attack_bonus = player.view().attack_bonus
     return [
         {
             'label': f"{skill['name'].capitalize()} (Damage: {skill['damage'] + attack_bonus})",
@@ -128,6 +172,7 @@ def get_skill_actions(player):
 
 
 def render_game(player, dungeon, narrative, actions, saved, enemy=None, enemy_description=None, interaction=None, enemy_defeated_transition=False, merchant=None):
+    view = player.view()
     return render_template(
         'game.html',
         narrative=narrative,
@@ -135,17 +180,17 @@ def render_game(player, dungeon, narrative, actions, saved, enemy=None, enemy_de
         actions=actions,
         health=player.health,
         max_health=player.max_health,
-        inventory=player.get_inventory(),
-        inventory_items=player.get_inventory_items(),
-        equipment_items=player.get_equipment_details(),
-        equipped_loadout=player.get_equipped_loadout(),
+        inventory=player.inventory,
+        inventory_items=view.inventory_items,
+        equipment_items=view.equipment_details,
+        equipped_loadout=view.equipped_loadout,
         saved=saved,
         enemy=enemy,
         enemy_description=enemy_description,
         merchant=merchant,
         player_defense=player.defense,
-        player_attack_bonus=player.get_attack_bonus(),
-        player_gold=player.inventory.get('gold', 0),
+        player_attack_bonus=view.attack_bonus,
+        player_gold=view.gold,
         player_level=player.level,
         player_experience=player.experience,
         next_level_experience=player.level * 10,
@@ -165,8 +210,8 @@ def render_current_room(player, dungeon, saved, interaction=None, narrative_over
         narrative = narrative_override
     elif enemy:
         narrative = enemy_description or f"A {enemy.name} appears!"
-    elif merchant and merchant.description:
-        narrative = merchant.description
+    elif merchant and merchant.description_text:
+        narrative = merchant.description_text
     else:
         narrative = dungeon.get_room_description(player)
 
@@ -186,10 +231,10 @@ def render_current_room(player, dungeon, saved, interaction=None, narrative_over
 
 def handle_player_defeat(player, dungeon, user_id, save_slot, saved, interaction):
     lost_gold = 0
-    current_gold = player.inventory.get('gold', 0)
+    current_gold = player.inventory.gold
     if current_gold > 0:
         lost_gold = max(1, current_gold // 4)
-        player.inventory['gold'] = max(0, current_gold - lost_gold)
+        player.remove_item_from_inventory('gold', lost_gold)
 
     player.health = player.max_health
     player.player_location = dungeon.start_location[0]
@@ -198,7 +243,7 @@ def handle_player_defeat(player, dungeon, user_id, save_slot, saved, interaction
     if lost_gold:
         defeat_lines.append(f'You dropped {lost_gold} gold in the dark.')
 
-    if not persist_game_state(player, dungeon, user_id, save_slot):
+    if not persist_game_state(player, dungeon, user_id, save_slot, 'defeat', {'lost_gold': lost_gold}):
         return redirect(url_for('auth.select_save'))
 
     return render_current_room(
@@ -222,14 +267,15 @@ def handle_combat_action(player, dungeon, enemy, enemy_description, action, user
             interaction="That skill is not available.",
         )
 
-    room_state = _normalize_room_state(dungeon.room_enemies.get(str(player.player_location)))
+    room_state = dungeon.room_state(player.player_location)
 
     if enemy.health <= 0:
         loot_summary = player.collect_loot(enemy.loot)
         experience = player.gain_experience(dungeon.floor_level * 4 + enemy.defense + len(enemy.skills))
         narrative = f"{enemy.name} is defeated!"
-        set_room_state(dungeon, player.player_location, merchant=room_state['merchant'])
-        if not persist_game_state(player, dungeon, user_id, save_slot):
+        dungeon.set_room_state(player.player_location, merchant=room_state.merchant)
+        details = {'enemy': enemy.name, 'loot': loot_summary, 'experience': experience['awarded']}
+        if not persist_game_state(player, dungeon, user_id, save_slot, 'loot', details):
             return redirect(url_for('auth.select_save'))
 
         reward_lines = [f"Gained {experience['awarded']} experience."]
@@ -254,19 +300,13 @@ def handle_combat_action(player, dungeon, enemy, enemy_description, action, user
 
     enemy_attack = enemy.attack_player(player)
     interaction += f"\n{enemy.name} uses {enemy_attack['skill_used']} and deals {enemy_attack['damage_dealt']} damage! (Your HP: {player.health})"
-    set_room_state(dungeon, player.player_location, enemy={
-        "name": enemy.name,
-        "health": enemy.health,
-        "max_health": enemy.max_health,
-        "defense": enemy.defense,
-        "skills": enemy.skills,
-        "loot": enemy.loot,
-    }, merchant=room_state['merchant'])
+    dungeon.set_room_state(player.player_location, enemy=EnemyState.from_enemy(enemy), merchant=room_state.merchant)
 
     if player.health <= 0:
         return handle_player_defeat(player, dungeon, user_id, save_slot, saved, interaction)
 
-    if not persist_game_state(player, dungeon, user_id, save_slot):
+    details = {'skill': action[len('skill_'):], 'enemy': enemy.name, 'enemy_health': enemy.health}
+    if not persist_game_state(player, dungeon, user_id, save_slot, 'attack', details):
         return redirect(url_for('auth.select_save'))
     return None, interaction
 
@@ -277,23 +317,16 @@ def handle_heal_action(player, dungeon, enemy, user_id, save_slot, saved):
     else:
         interaction = "You don't have any health potions left."
 
-    room_state = _normalize_room_state(dungeon.room_enemies.get(str(player.player_location)))
+    room_state = dungeon.room_state(player.player_location)
     if enemy:
         enemy_attack = enemy.attack_player(player)
         interaction += f" {enemy.name} uses {enemy_attack['skill_used']} and deals {enemy_attack['damage_dealt']} damage! (Your HP: {player.health})"
-        set_room_state(dungeon, player.player_location, enemy={
-            "name": enemy.name,
-            "health": enemy.health,
-            "max_health": enemy.max_health,
-            "defense": enemy.defense,
-            "skills": enemy.skills,
-            "loot": enemy.loot,
-        }, merchant=room_state['merchant'])
+        dungeon.set_room_state(player.player_location, enemy=EnemyState.from_enemy(enemy), merchant=room_state.merchant)
 
         if player.health <= 0:
             return handle_player_defeat(player, dungeon, user_id, save_slot, saved, interaction)
 
-    if not persist_game_state(player, dungeon, user_id, save_slot):
+    if not persist_game_state(player, dungeon, user_id, save_slot, 'heal', {'health': player.health}):
         return redirect(url_for('auth.select_save'))
 
     return interaction
@@ -322,7 +355,7 @@ def handle_inventory_action(player, dungeon, enemy, action, user_id, save_slot,
         )
 
     equipment_result = player.toggle_equipment(item_name)
-    if not persist_game_state(player, dungeon, user_id, save_slot):
+    if not persist_game_state(player, dungeon, user_id, save_slot, 'equip', {'item': item_name}):
         return redirect(url_for('auth.select_save'))
     return render_current_room(player, dungeon, saved=saved, interaction=equipment_result['message'])
 
@@ -334,10 +367,11 @@ def handle_merchant_action(player, dungeon, merchant, action, user_id, save_slot
     else:
         result = merchant.buy_item_from_player(item_name, player)
 
-    room_state = _normalize_room_state(dungeon.room_enemies.get(str(player.player_location)))
-    set_room_state(dungeon, player.player_location, enemy=room_state['enemy'], merchant=merchant.to_state())
+    room_state = dungeon.room_state(player.player_location)
+    dungeon.set_room_state(player.player_location, enemy=room_state.enemy, merchant=merchant.to_state())
 
-    if not persist_game_state(player, dungeon, user_id, save_slot):
+    details = {'side': 'buy' if action.startswith('merchant_buy::') else 'sell', 'item': item_name}
+    if not persist_game_state(player, dungeon, user_id, save_slot, 'trade', details):
         return redirect(url_for('auth.select_save'))
 
     return render_current_room(player, dungeon, saved=saved, interaction=result['message'], merchant=merchant)
@@ -348,8 +382,10 @@ def handle_move_action(player, dungeon, direction, user_id, save_slot, saved):
     if direction in valid_directions and player.move(direction, dungeon):
         enemy, enemy_description = build_enemy_for_room(dungeon, player.player_location)
         merchant, merchant_description = build_merchant_for_room(dungeon, player.player_location)
-        if not persist_game_state(player, dungeon, user_id, save_slot):
+        details = {'direction': direction, 'room': player.player_location}
+        if not persist_game_state(player, dungeon, user_id, save_slot, 'move', details):
             return redirect(url_for('auth.select_save'))
+        prepare_next_floor_if_at_exit(player, dungeon, user_id, save_slot)
 
         if enemy:
             narrative = enemy_description or f"A {enemy.name} appears!"
@@ -374,12 +410,10 @@ def handle_move_action(player, dungeon, direction, user_id, save_slot, saved):
 
 
 def handle_descend_action(player, user_id, save_slot, saved):
-    from backend.game.dungeon import Dungeon
-
     player.dungeon_floor += 1
-    dungeon = Dungeon(width=10, height=10, num_rooms=5, floor_level=player.dungeon_floor)
-    dungeon.generate()
+    # Usually prepared in the background when the player reached the exit.
+    dungeon = take_next_floor(user_id, save_slot, player.dungeon_floor)
     player.player_location = dungeon.start_location[0]
-    if not persist_game_state(player, dungeon, user_id, save_slot):
+    if not persist_game_state(player, dungeon, user_id, save_slot, 'descend', {'floor': player.dungeon_floor}):
         return redirect(url_for('auth.select_save'))
     return render_current_room(player, dungeon, saved=saved)
@@ -2,13 +2,25 @@ import json
 
 from flask import Blueprint, jsonify, redirect, request, session, url_for
 
-from backend.app.db import supabase
-from backend.app.game_action import build_enemy_for_room, build_merchant_for_room, persist_game_state, render_current_room, set_room_state
-from backend.game.player import Player
+from backend.app import _env_flag
+from backend.app.db import EVENT_LOG, get_storage
+from backend.app.game_action import build_enemy_for_room, build_merchant_for_room, persist_game_state, render_current_room
+from backend.app.game_session import GameSession
+from backend.app.save_journal import get_save_journal
+from backend.app.session_cache import get_session_cache
+from backend.app.write_behind import SaveBusyError, get_write_behind
+from backend.game.inventory import Inventory
 from backend.game.dungeon import Dungeon
+from backend.game.room_state import EnemyState
 
 game_api = Blueprint('game_api', __name__)
 
+MAX_DUNGEON_SIDE = 1000
+MAX_DUNGEON_ROOMS = 100_000
+# The cache, queue and journal stats cover every player, so they are only
+# served when an operator turns them on.
+DEBUG_STATS = _env_flag("DEBUG_STATS")
+
 
 def _parse_int(value, default):
     try:
@@ -16,6 +28,11 @@ def _parse_int(value, default):
     except (TypeError, ValueError):
         return default
 
+@game_api.app_errorhandler(SaveBusyError)
+def save_busy(error):
+    print(f"Gave up waiting for queued saves: {error}")
+    return jsonify({'error': 'The game is still being saved, try again shortly'}), 503, {'Retry-After': '1'}
+
 @game_api.route('/api/dungeon', methods=['POST'])
 def generate_dungeon():
     user_id = session.get('user_id')
@@ -23,24 +40,25 @@ def generate_dungeon():
     if not user_id or save_slot is None:
         return redirect(url_for('auth.login_route'))
 
-    # Fetch the player's save data
-    response = supabase.table('player_saves').select('id').eq('user_id', user_id).eq('save_slot', save_slot).execute()
-    if not response.data:
+    # Fetch the player's save data once its queued writes have landed
+    game_session = GameSession.load(user_id, save_slot)
+    if game_session is None:
         return jsonify({'error': 'Player save not found'}), 404
-    player_save_id = response.data[0]['id']
 
     data = request.get_json(silent=True) or {}
-    width = max(3, _parse_int(data.get('width', 10), 10))
-    height = max(3, _parse_int(data.get('height', 10), 10))
-    num_rooms = max(2, _parse_int(data.get('num_rooms', 15), 15))
+    width = min(MAX_DUNGEON_SIDE, max(3, _parse_int(data.get('width', 10), 10)))
+    height = min(MAX_DUNGEON_SIDE, max(3, _parse_int(data.get('height', 10), 10)))
+    num_rooms = min(MAX_DUNGEON_ROOMS, width * height, max(2, _parse_int(data.get('num_rooms', 15), 15)))
     floor_level = max(1, _parse_int(data.get('floor_level', 1), 1))
 
     # Generate a new dungeon
     dungeon = Dungeon(width, height, num_rooms, floor_level)
     dungeon.generate()
 
-    # Save the dungeon to the database
-    dungeon.save_to_db(player_save_id, user_id=user_id, save_slot=save_slot)
+    # Save the dungeon as a new version of the save, behind any queued or
+    # journaled saves; with EVENT_LOG it is a snapshot, dropping the old floor's events.
+    if not persist_game_state(game_session.player, dungeon, user_id, save_slot, 'new_dungeon', {'floor': floor_level}):
+        return jsonify({'error': 'Could not save the dungeon'}), 500
 
     return jsonify({
         'grid_size': {'width': dungeon.width, 'height': dungeon.height},
@@ -59,11 +77,14 @@ def get_player_stats():
     if not user_id or save_slot is None:
         return redirect(url_for('auth.login_route'))
 
-    # Fetch the player's save data
-    response = supabase.table('player_saves').select('*').eq('user_id', user_id).eq('save_slot', save_slot).execute()
-    if not response.data:
+    # Fetch the player's save data once its queued writes have landed
+    get_write_behind().flush(user_id, save_slot)
+    if EVENT_LOG:
+        player_save = get_storage().load_player_save(user_id, save_slot)
+    else:
+        player_save = get_storage().get_player_save(user_id, save_slot)
+    if not player_save:
         return jsonify({'error': 'Player save not found'}), 404
-    player_save = response.data[0]
 
     # Return player stats
     return jsonify({
@@ -74,33 +95,44 @@ def get_player_stats():
         'health': player_save['health'],
         'max_health': player_save['max_health'],
         'defense': player_save['defense'],
-        'inventory': Player.normalize_inventory(json.loads(player_save['inventory'])),
+        'inventory': Inventory.from_data(json.loads(player_save['inventory'])).to_summary(),
         'skills': json.loads(player_save['skills']),
         'dungeon_floor': player_save['dungeon_floor'],
         'player_location': str(player_save['player_location']).strip('"'),
         'save_slot': player_save['save_slot']
     })
 
+@game_api.route('/api/session_cache', methods=['GET'])
+def get_session_cache_stats():
+    if not DEBUG_STATS:
+        return jsonify({'error': 'Not found'}), 404
+    if not session.get('user_id'):
+        return redirect(url_for('auth.login_route'))
+
+    journal = get_save_journal()
+    return jsonify(dict(
+        get_session_cache().stats(),
+        write_behind=get_write_behind().stats(),
+        save_journal=journal.stats() if journal is not None else None,
+    ))
+
 @game_api.route('/load_save/<int:save_slot>', methods=['GET'])
 def load_save(save_slot):
     user_id = session.get('user_id')
     if not user_id or save_slot is None:
         return redirect(url_for('auth.login_route'))
 
-    player = Player.load_or_create_player(user_id, save_slot)
-    dungeon = Dungeon.load_from_db(user_id=user_id, save_slot=save_slot)
-    if not player or not dungeon:
+    game_session = GameSession.load(user_id, save_slot)
+    if not game_session or not game_session.dungeon:
         return redirect(url_for('auth.select_save'))
+    player, dungeon = game_session.player, game_session.dungeon
 
     enemy, enemy_description = build_enemy_for_room(dungeon, player.player_location)
     merchant, _ = build_merchant_for_room(dungeon, player.player_location)
     if enemy:
-        room_state = dungeon.room_enemies.get(str(player.player_location), {})
-        enemy_state = room_state.get('enemy') if isinstance(room_state, dict) and 'enemy' in room_state else room_state
-        if enemy_state.get('loot') is None:
-            enemy_state['loot'] = enemy.loot
-            merchant_state = room_state.get('merchant') if isinstance(room_state, dict) else None
-            set_room_state(dungeon, player.player_location, enemy=enemy_state, merchant=merchant_state)
+        room_state = dungeon.room_state(player.player_location)
+        if room_state.enemy.loot is None:
+            dungeon.set_room_state(player.player_location, enemy=EnemyState.from_enemy(enemy), merchant=room_state.merchant)
             persist_game_state(player, dungeon, user_id, save_slot)
         session['enemy'] = {
             'name': enemy.name,
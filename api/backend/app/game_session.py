@@ -0,0 +1,61 @@
+from backend.app.db import DUNGEON_PERSISTENCE, EVENT_LOG, PERSISTENCE_MODE, get_storage
+from backend.app.save_journal import get_save_journal
+from backend.app.session_cache import get_session_cache
+from backend.app.write_behind import get_write_behind
+from backend.game.dungeon import DUNGEON_COLUMNS, Dungeon
+from backend.game.player import Player
+
+
+class GameSession():
+    """A player save and the dungeon it is exploring."""
+
+    def __init__(self, user_id: int, save_slot: int, player: Player, dungeon: Dungeon | None):
+        self.user_id = user_id
+        self.save_slot = save_slot
+        self.player = player
+        self.dungeon = dungeon
+
+    def has_changes(self):
+        """Whether the player or dungeon changed since they were loaded or last saved."""
+        return bool(self.player.changed_fields()) or bool(self.dungeon and self.dungeon.has_changes())
+
+    @classmethod
+    def load(cls, user_id: int, save_slot: int):
+        """
+        Load the player save and its dungeon, from the session cache when this
+        worker saved it recently and with a single storage read otherwise.
+        Queued writes for the save are finished before storage is read, and
+        with PERSISTENCE_MODE=async_flush before a cached session is used too;
+        SaveBusyError is raised if they take longer than FLUSH_TIMEOUT.
+        While the save journal holds saves storage has not taken yet, the game
+        is loaded from the journal instead. With EVENT_LOG the stored snapshot
+        is brought up to date with the events logged after it.
+
+        Returns:
+            GameSession: The loaded session, or None if the save does not exist.
+        """
+        if PERSISTENCE_MODE == 'async_flush':
+            get_write_behind().flush(user_id, save_slot)
+
+        cached = get_session_cache().take(user_id, save_slot)
+        if cached is not None:
+            return cached
+
+        get_write_behind().flush(user_id, save_slot)
+
+        journal = get_save_journal()
+        game_state = journal.latest_state(user_id, save_slot) if journal is not None else None
+        if game_state is None:
+            game_state = get_storage().load_game_state(
+                user_id, save_slot, dungeon_columns=DUNGEON_COLUMNS,
+                with_rooms=DUNGEON_PERSISTENCE == 'rooms', with_events=EVENT_LOG,
+            )
+        if game_state is None:
+            return None
+
+        player_save, dungeon_data = game_state
+        player = Player.from_record(player_save)
+        dungeon = Dungeon.from_record(dungeon_data) if dungeon_data else None
+        if dungeon and dungeon.layout_changed:
+            player.player_location = dungeon.start_location[0]
+        return cls(user_id, save_slot, player, dungeon)
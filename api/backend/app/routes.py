@@ -5,7 +5,7 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 from backend.app.auth import create_account, login
-from backend.app.db import supabase
+from backend.app.db import get_storage
 from backend.app.game_action import (
     build_enemy_for_room,
     build_merchant_for_room,
@@ -16,8 +16,13 @@ from backend.app.game_action import (
     handle_merchant_action,
     handle_move_action,
     persist_game_state,
+    prepare_next_floor_if_at_exit,
     render_current_room,
 )
+from backend.app.game_session import GameSession
+from backend.app.save_journal import get_save_journal
+from backend.app.session_cache import get_session_cache
+from backend.app.write_behind import get_write_behind
 from backend.game.dungeon import Dungeon
 from backend.game.data_utils import load_json_file
 from backend.game.player import Player
@@ -116,8 +121,11 @@ def select_save():
 
         if action == 'delete':
             # Delete the selected save slot
-            supabase.table('dungeons').delete().eq('user_id', user_id).eq('save_slot', save_slot).execute()
-            supabase.table('player_saves').delete().eq('user_id', user_id).eq('save_slot', save_slot).execute()
+            get_write_behind().flush(user_id, save_slot)
+            if get_save_journal() is not None:
+                get_save_journal().discard(user_id, save_slot)
+            get_storage().delete_save(user_id, save_slot)
+            get_session_cache().invalidate(user_id, save_slot)
             if session.get('save_slot') == save_slot:
                 session.pop('save_slot', None)
             return redirect(url_for('auth.select_save'))
@@ -127,9 +135,9 @@ def select_save():
             session['save_slot'] = save_slot
 
             # Redirect to the character creation route for new saves
-            response = supabase.table('player_saves').select('*').eq('user_id', user_id).eq('save_slot', save_slot).execute()
+            player_save = get_storage().get_player_save(user_id, save_slot)
 
-            if not response or not response.data or len(response.data) == 0:
+            if not player_save:
                 return redirect(url_for('auth.create_character', step=1))
 
             # Redirect to the game with the selected save slot
@@ -149,12 +157,9 @@ def select_save():
 
 def get_save_slots(user_id):
     """Fetch save slots for the user."""
-    response = supabase.table('player_saves').select('*').eq('user_id', user_id).execute()
+    player_saves = get_storage().list_player_saves(user_id)
 
-    if not response.data:
-        response.data = []
-
-    used_slots = {int(save['save_slot']): save for save in response.data}
+    used_slots = {int(save['save_slot']): save for save in player_saves}
     save_slots = []
 
     for slot in range(1, 4):
@@ -180,11 +185,10 @@ def save_game():
         return redirect(url_for('auth.login_route'))
     
     # Load the player and dungeon
-    player = Player.load_or_create_player(user_id, save_slot)
-    dungeon = Dungeon.load_from_db(user_id=user_id, save_slot=save_slot)
-
-    if not player or  not dungeon:
+    game_session = GameSession.load(user_id, save_slot)
+    if not game_session or not game_session.dungeon:
         return redirect(url_for('auth.select_save'))
+    player, dungeon = game_session.player, game_session.dungeon
     
     if not persist_game_state(player, dungeon, user_id, save_slot):
         return redirect(url_for('auth.select_save'))
@@ -248,12 +252,10 @@ def create_character():
                 return redirect(url_for('auth.create_character', step=1))  # Reset if missing
 
             player = Player(name=name, player_class=player_class, save_slot=save_slot)
-            dungeon_response = supabase.table('dungeons').select('*').eq('user_id', user_id).eq('save_slot', save_slot).execute()
-            if not dungeon_response.data:
+            dungeon = Dungeon.load_from_db(user_id=user_id, save_slot=save_slot)
+            if dungeon is None:
                 dungeon = Dungeon(width=10, height=10, num_rooms=5, floor_level=1)
                 dungeon.generate()
-            else:
-                dungeon = Dungeon.load_from_db(user_id=user_id, save_slot=save_slot)
 
             player.player_location = dungeon.start_location[0]
             if not persist_game_state(player, dungeon, user_id, save_slot):
@@ -290,10 +292,11 @@ def game_action():
     if not user_id or save_slot is None:
         return redirect(url_for('auth.login_route'))
 
-    player = Player.load_or_create_player(user_id, save_slot)
-    dungeon = Dungeon.load_from_db(user_id=user_id, save_slot=save_slot)
-    if not player or dungeon is None:
+    game_session = GameSession.load(user_id, save_slot)
+    if not game_session or game_session.dungeon is None:
         return redirect(url_for('auth.select_save'))
+    player, dungeon = game_session.player, game_session.dungeon
+    prepare_next_floor_if_at_exit(player, dungeon, user_id, save_slot)
 
     action = request.form.get('action')
     saved = str(request.args.get('saved', '')).lower() == 'true'
@@ -0,0 +1,401 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from backend.app.db import get_storage
+from backend.app.session_cache import get_session_cache
+from backend.app.storage import StaleSaveError
+from backend.app.write_behind import PendingSave
+
+SAVE_JOURNAL_PATH = os.getenv("SAVE_JOURNAL_PATH", "").strip()  # Empty disables the journal
+SAVE_TIMEOUT = float(os.getenv("SAVE_TIMEOUT", "5"))  # Seconds before a storage write counts as failed
+SAVE_BREAKER_THRESHOLD = int(os.getenv("SAVE_BREAKER_THRESHOLD", "3"))
+SAVE_RETRY_BASE_DELAY = float(os.getenv("SAVE_RETRY_BASE_DELAY", "0.5"))
+SAVE_RETRY_MAX_DELAY = float(os.getenv("SAVE_RETRY_MAX_DELAY", "30"))
+
+SCHEMA = """
+create table if not exists journal (
+    id integer primary key autoincrement,
+    user_id integer not null,
+    save_slot integer not null,
+    save text not null,
+    created_at real not null
+);
+
+create index if not exists journal_save on journal (user_id, save_slot, id);
+
+create table if not exists journal_state (
+    user_id integer not null,
+    save_slot integer not null,
+    player text not null,
+    dungeon text,
+    primary key (user_id, save_slot)
+);
+"""
+
+
+class CircuitBreaker():
+    """
+    Stops calling storage after repeated failures.
+
+    Closed, every call is allowed. threshold failures in a row open it, and
+    while open nothing is allowed until delay has passed; then a single trial
+    call is let through (half open). A successful trial closes the breaker, a
+    failed one reopens it with the delay doubled, up to max_delay.
+    """
+
+    def __init__(self, threshold: int = SAVE_BREAKER_THRESHOLD, base_delay: float = SAVE_RETRY_BASE_DELAY,
+                 max_delay: float = SAVE_RETRY_MAX_DELAY, clock=time.monotonic):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.delay = base_delay
+        self._opened_at = 0.0
+
+    def allow(self):
+        """Whether a storage call may be made now."""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self._clock() - self._opened_at >= self.delay:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def wait_time(self):
+        """Seconds until the next trial call is allowed."""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self.delay - (self._clock() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.delay = self.base_delay
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open':
+                self.delay = min(self.delay * 2, self.max_delay)
+            elif self.failures < self.threshold:
+                return
+            self.state = 'open'
+            self._opened_at = self._clock()
+
+
+class SaveJournal():
+    """
+    Local append-only journal of saves that storage has not confirmed yet.
+
+    Every save is appended before it is written and removed once storage
+    accepts it. A save that fails or times out stays in the journal and
+    write() still succeeds; a background thread replays the journal in order
+    per save slot, merging each slot's entries into one write, paced by the
+    circuit breaker. While a slot has entries, the journal also keeps the
+    whole game as of its latest save, so the game can be loaded without
+    storage until the backlog is written.
+    """
+
+    def __init__(self, path: str, breaker: CircuitBreaker | None = None, timeout: float = SAVE_TIMEOUT):
+        self.path = path
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+        self._io = ThreadPoolExecutor(max_workers=4, thread_name_prefix='save-io')
+        self._writing = set()  # Slots with a storage write in flight
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._replayer = None
+        self.journaled = 0
+        self.replayed = 0
+        self.failed = 0
+        if self._pending_keys():
+            # Entries left over from a previous process.
+            self._start_replayer()
+
+    # Journal rows
+
+    def _pending_keys(self):
+        with self._lock:
+            rows = self._connection.execute('select distinct user_id, save_slot from journal').fetchall()
+        return [(row['user_id'], row['save_slot']) for row in rows]
+
+    def _replayable_keys(self):
+        """Slots with a backlog and no storage write in flight."""
+        keys = self._pending_keys()
+        with self._lock:
+            return [key for key in keys if key not in self._writing]
+
+    def _has_entries(self, key):
+        return self._connection.execute(
+            'select 1 from journal where user_id = ? and save_slot = ? limit 1', key
+        ).fetchone() is not None
+
+    def _store_state(self, key, state):
+        player_record, dungeon_record = state
+        self._connection.execute(
+            'insert into journal_state (user_id, save_slot, player, dungeon) values (?, ?, ?, ?) '
+            'on conflict (user_id, save_slot) do update set player = excluded.player, dungeon = excluded.dungeon',
+            (*key, json.dumps(player_record), json.dumps(dungeon_record) if dungeon_record else None),
+        )
+
+    def _remove(self, key, last_id):
+        """Remove a slot's entries up to last_id, and its state once none are left."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'delete from journal where user_id = ? and save_slot = ? and id <= ?', (*key, last_id)
+            )
+            if not self._has_entries(key):
+                self._connection.execute('delete from journal_state where user_id = ? and save_slot = ?', key)
+
+    def discard(self, user_id: int, save_slot: int):
+        """Drop a slot's journaled saves, for a save that is being deleted."""
+        with self._lock, self._connection:
+            self._connection.execute('delete from journal where user_id = ? and save_slot = ?', (user_id, save_slot))
+            self._connection.execute(
+                'delete from journal_state where user_id = ? and save_slot = ?', (user_id, save_slot)
+            )
+
+    def latest_state(self, user_id: int, save_slot: int):
+        """
+        Return the game as of a slot's latest journaled save.
+
+        Returns:
+            tuple: (player_saves row, dungeons row), or None if the slot has no backlog.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'select player, dungeon from journal_state where user_id = ? and save_slot = ?', (user_id, save_slot)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row['player']), json.loads(row['dungeon']) if row['dungeon'] else None
+
+    # Writing
+
+    def _apply(self, pending_save):
+        """Write a save to storage, giving up after the timeout."""
+        try:
+            future = self._io.submit(pending_save.apply, get_storage())
+        except RuntimeError:
+            # The pool refuses work once the interpreter is shutting down.
+            self.stop()
+            raise
+        player_save_id = future.result(timeout=self.timeout)
+        if player_save_id is None:
+            raise RuntimeError('storage wrote nothing')
+
+    def write(self, user_id: int, save_slot: int, pending_save: PendingSave, state_fn=None):
+        """
+        Journal a save, then write it unless older entries or the breaker hold it back.
+
+        Parameters:
+            state_fn (callable): Returns the (player_saves row, dungeons row) state
+                                 to keep if the save stays journaled; pending_save.state
+                                 is used when it is already set.
+
+        Returns:
+            bool: False only if storage rejected the save as stale.
+        """
+        key = (user_id, save_slot)
+        with self._lock, self._connection:
+            backlog = self._has_entries(key) or key in self._writing
+            entry_id = self._connection.execute(
+                'insert into journal (user_id, save_slot, save, created_at) values (?, ?, ?, ?)',
+                (*key, json.dumps(pending_save.to_data()), time.time()),
+            ).lastrowid
+            write_now = not backlog and self.breaker.allow()
+            if write_now:
+                self._writing.add(key)
+            else:
+                self.journaled += 1
+
+        if not write_now:
+            self._keep_state(key, pending_save, state_fn)
+            self._start_replayer()
+            return True
+
+        try:
+            self._apply(pending_save)
+        except StaleSaveError as e:
+            print(f"Save {key} was rejected as stale: {e}")
+            self._remove(key, entry_id)
+            self._finish(key)
+            return False
+        except Exception as e:
+            print(f"Error writing save {key}; keeping it in the journal: {e!r}")
+            self.breaker.record_failure()
+            self._keep_state(key, pending_save, state_fn)
+            with self._lock:
+                self.journaled += 1
+            self._finish(key)
+            self._start_replayer()
+            return True
+
+        self.breaker.record_success()
+        self._remove(key, entry_id)
+        self._finish(key)
+        return True
+
+    def _keep_state(self, key, pending_save, state_fn):
+        state = pending_save.state or (state_fn() if state_fn else None)
+        if state is None:
+            return
+        with self._lock, self._connection:
+            self._store_state(key, state)
+
+    def _finish(self, key):
+        with self._lock:
+            self._writing.discard(key)
+        # Saves journaled behind this write are left to the replayer.
+        self._wake.set()
+
+    # Replay
+
+    def _start_replayer(self):
+        with self._lock:
+            if self._replayer is None and not self._stopped.is_set():
+                self._replayer = threading.Thread(target=self._replay_forever, name='save-journal', daemon=True)
+                self._replayer.start()
+                atexit.register(self.stop)
+        self._wake.set()
+
+    def stop(self):
+        """Stop replaying; journaled saves stay on disk for the next process."""
+        self._stopped.set()
+        self._wake.set()
+
+    def _replay_forever(self):
+        while not self._stopped.is_set():
+            keys = self._replayable_keys()
+            if not keys:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            wait_time = self.breaker.wait_time()
+            if wait_time:
+                self._wake.wait(wait_time)
+                self._wake.clear()
+                continue
+
+            for key in keys:
+                if self._stopped.is_set() or not self.breaker.allow() or not self.replay(key):
+                    break
+            else:
+                continue
+            # Back off before the next pass when a write failed or the breaker is open.
+            self._stopped.wait(min(self.breaker.wait_time() or self.breaker.base_delay, self.breaker.max_delay))
+
+    def replay(self, key):
+        """
+        Write a slot's journaled saves as one merged save.
+
+        Returns:
+            bool: False if storage failed, so replay should back off.
+        """
+        with self._lock:
+            if key in self._writing:
+                return True
+            rows = self._connection.execute(
+                'select id, save from journal where user_id = ? and save_slot = ? order by id', key
+            ).fetchall()
+            if not rows:
+                return True
+            self._writing.add(key)
+
+        saves = [json.loads(row['save']) for row in rows]
+        try:
+            self._apply(self._merge(saves))
+        except StaleSaveError:
+            saves = self._unapplied(key, saves)
+            try:
+                if saves:
+                    self._apply(self._merge(saves))
+            except StaleSaveError as e:
+                print(f"Dropping journaled saves for {key} that conflict with storage: {e}")
+                get_session_cache().invalidate(*key)
+            except Exception as e:
+                return self._replay_failed(key, e)
+        except Exception as e:
+            return self._replay_failed(key, e)
+
+        self.breaker.record_success()
+        self._remove(key, rows[-1]['id'])
+        self._finish(key)
+        with self._lock:
+            self.replayed += len(rows)
+        return True
+
+    @staticmethod
+    def _merge(saves):
+        """Merge journaled saves, given as their to_data() dicts, into one PendingSave."""
+        merged = PendingSave.from_data(json.loads(json.dumps(saves[0])))
+        for data in saves[1:]:
+            merged.merge(PendingSave.from_data(data))
+        return merged
+
+    def _unapplied(self, key, saves):
+        """Drop saves storage already holds, such as one whose write outlived its timeout."""
+        player_save = get_storage().get_player_save(*key)
+        stored_version = (player_save or {}).get('version') or 0
+        return [data for data in saves if data['player']['version'] > stored_version]
+
+    def _replay_failed(self, key, error):
+        if self._stopped.is_set():
+            # Shutting down; the saves are replayed by the next process.
+            self._finish(key)
+            return False
+        print(f"Error replaying journaled saves for {key}: {error!r}")
+        self.breaker.record_failure()
+        self._finish(key)
+        with self._lock:
+            self.failed += 1
+        return False
+
+    def stats(self):
+        """Return the journal counters, the breaker state and the number of slots with a backlog."""
+        pending = len(self._pending_keys())
+        with self._lock:
+            return {
+                'pending_slots': pending,
+                'journaled': self.journaled,
+                'replayed': self.replayed,
+                'failed': self.failed,
+                'breaker': self.breaker.state,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_save_journal():
+    """Return the process-wide save journal, or None when SAVE_JOURNAL_PATH is not set."""
+    return SaveJournal(SAVE_JOURNAL_PATH) if SAVE_JOURNAL_PATH else None
+
+
+def write_save(user_id: int, save_slot: int, pending_save: PendingSave, state_fn=None):
+    """
+    Write a save through the journal when one is configured, straight to storage otherwise.
+
+    Returns:
+        bool: Whether the save was written or journaled.
+    """
+    journal = get_save_journal()
+    if journal is None:
+        return pending_save.apply(get_storage()) is not None
+    return journal.write(user_id, save_slot, pending_save, state_fn)
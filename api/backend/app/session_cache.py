@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+# Budget in dungeon rooms, since a session's memory is dominated by its floor.
+# Each entry costs 1 plus its dungeon's room count; 0 disables the cache.
+SESSION_CACHE_ROOMS = int(os.getenv("SESSION_CACHE_ROOMS", "200000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "300"))  # Seconds
+
+
+class SessionCache():
+    """
+    Least recently used cache of decoded GameSessions keyed on (user_id, save_slot).
+
+    Sessions are written through: persist_game_state puts a session back only
+    after storage accepted the write, so a cached session always matches what
+    was stored by this worker. take() checks a session out rather than sharing
+    it, so two concurrent requests for one save never mutate the same objects;
+    the second loads from storage instead. Writes from other workers are caught
+    by the player_saves version check on the next save, and the TTL bounds how
+    long a stale session can be read.
+    """
+
+    def __init__(self, max_rooms: int = SESSION_CACHE_ROOMS, ttl: float = SESSION_CACHE_TTL, clock=time.monotonic):
+        self.max_rooms = max_rooms
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (user_id, save_slot) -> (session, cost, stored_at)
+        self.rooms = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _cost(game_session):
+        return 1 + (game_session.dungeon.num_rooms if game_session.dungeon else 0)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.rooms -= entry[1]
+        return entry
+
+    def take(self, user_id: int, save_slot: int):
+        """
+        Remove and return the cached session for a save.
+
+        Returns:
+            GameSession: The session, or None if it is not cached, has expired,
+                         or has changes that were never saved.
+        """
+        with self._lock:
+            entry = self._pop((user_id, save_slot))
+            if entry is None:
+                self.misses += 1
+                return None
+
+            game_session, _, stored_at = entry
+            if self._clock() - stored_at > self.ttl:
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if game_session.has_changes():
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return game_session
+
+    def put(self, game_session):
+        """Cache a session that matches storage, evicting the least recently used ones past the budget."""
+        cost = self._cost(game_session)
+        if cost > self.max_rooms:
+            return
+
+        key = (game_session.user_id, game_session.save_slot)
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (game_session, cost, self._clock())
+            self.rooms += cost
+            while self.rooms > self.max_rooms:
+                _, (_, evicted_cost, _) = self._entries.popitem(last=False)
+                self.rooms -= evicted_cost
+                self.evictions += 1
+
+    def invalidate(self, user_id: int, save_slot: int):
+        """Drop a save's session, for writes that bypass persist_game_state."""
+        with self._lock:
+            if self._pop((user_id, save_slot)) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        """Return the hit, miss and eviction counters plus the current size."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'rooms': self.rooms,
+                'max_rooms': self.max_rooms,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_session_cache():
+    """Return the process-wide session cache."""
+    return SessionCache()
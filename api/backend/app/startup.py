@@ -0,0 +1,124 @@
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from backend.app import ENV_FILE, _env_flag
+
+
+class StartupProfiler():
+    """
+    Break cold start time down per imported module and per init phase.
+
+    Import timing wraps builtins.__import__ and records every module that was
+    not yet loaded, with its inclusive time and its self time (inclusive minus
+    the modules it imported). It only depends on the standard library and the
+    flask-free backend.app package (plus python-dotenv to read its own flag),
+    so it can be imported before anything it measures.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.imports = []
+        self.phases = []
+        self._import_stack = []
+        self._started_at = time.perf_counter()
+
+    @contextmanager
+    def track_imports(self):
+        """Record the cost of every first-time import inside the block."""
+        if not self.enabled:
+            yield
+            return
+
+        original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            module_name = name
+            if level and globals:
+                package = globals.get('__package__') or ''
+                base = package.rsplit('.', level - 1)[0] if level > 1 else package
+                module_name = f"{base}.{name}" if name else base
+            if module_name in sys.modules:
+                # "from package import submodule" loads the submodule without
+                # a separate __import__ call for it.
+                module = sys.modules[module_name]
+                missing = [
+                    item for item in fromlist or ()
+                    if item != '*' and not hasattr(module, item) and f"{module_name}.{item}" not in sys.modules
+                ]
+                if not missing:
+                    return original_import(name, globals, locals, fromlist, level)
+                module_name = f"{module_name}.{missing[0]}"
+
+            self._import_stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = time.perf_counter() - started
+                child_time = self._import_stack.pop()
+                if self._import_stack:
+                    self._import_stack[-1] += elapsed
+                self.imports.append((module_name, elapsed, elapsed - child_time))
+
+        builtins.__import__ = timed_import
+        try:
+            yield
+        finally:
+            builtins.__import__ = original_import
+
+    @contextmanager
+    def phase(self, name: str):
+        """Record the wall time of one named initialization step."""
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self, limit: int = 25) -> str:
+        """Return a readable summary of the slowest imports and every phase."""
+        total = time.perf_counter() - self._started_at
+        lines = [f"Startup profile: {total * 1000:.1f} ms since profiler start"]
+
+        if self.phases:
+            lines.append("Phases:")
+            for name, elapsed in self.phases:
+                lines.append(f"  {elapsed * 1000:9.1f} ms  {name}")
+
+        if self.imports:
+            lines.append(f"Slowest imports (inclusive / self, top {limit}):")
+            slowest = sorted(self.imports, key=lambda item: item[1], reverse=True)[:limit]
+            for module_name, inclusive, own in slowest:
+                lines.append(f"  {inclusive * 1000:9.1f} ms  {own * 1000:9.1f} ms  {module_name}")
+
+        return "\n".join(lines)
+
+    def emit(self):
+        """Print the report to stderr when profiling is enabled."""
+        if self.enabled:
+            print(self.report(), file=sys.stderr)
+
+
+def _profiling_enabled():
+    """
+    Read STARTUP_PROFILE from the environment or, failing that, from .env.
+
+    The profiler is built when index.py starts, before create_app() loads .env,
+    so the file is read here for this one flag without touching os.environ.
+    """
+    if os.getenv("STARTUP_PROFILE") is None:
+        from dotenv import dotenv_values
+
+        value = dotenv_values(ENV_FILE).get("STARTUP_PROFILE")
+        return value is not None and value.strip().lower() in {"1", "true", "yes", "on"}
+    return _env_flag("STARTUP_PROFILE")
+
+
+startup_profiler = StartupProfiler(enabled=_profiling_enabled())
@@ -0,0 +1,6 @@
+from backend.app.storage.base import StaleSaveError, StorageBackend
+from backend.app.storage.memory_storage import MemoryStorage
+from backend.app.storage.sqlite_storage import SQLiteStorage
+from backend.app.storage.supabase_storage import SupabaseStorage
+
+__all__ = ['StaleSaveError', 'StorageBackend', 'MemoryStorage', 'SQLiteStorage', 'SupabaseStorage']
@@ -0,0 +1,239 @@
+import json
+from abc import ABC, abstractmethod
+
+from backend.app.db import run_concurrently
+
+# The player_saves columns a new save must hold besides its keys and version.
+PLAYER_COLUMNS = (
+    'name', 'player_class', 'level', 'experience', 'health', 'max_health',
+    'defense', 'inventory', 'skills', 'dungeon_floor', 'player_location',
+)
+
+
+class StaleSaveError(Exception):
+    """Raised when a player save was written by someone else since it was loaded."""
+
+
+class StorageBackend(ABC):
+    """
+    Persistence interface for users, player saves and dungeons.
+
+    Rows are plain dicts shaped like the Supabase tables: JSON columns such as
+    inventory or room_enemies hold serialized strings, and every save is keyed
+    on (user_id, save_slot). dungeon_rooms rows are further keyed on room_id and
+    hold one room's entry of each room state column, NULL where it is unchanged.
+
+    player_saves.version goes up by one on every save. A player record carrying
+    a version is only written if the stored version is its base_version, or
+    base_version is 0 for a new save; otherwise the write raises StaleSaveError
+    and nothing is written. base_version is not a column: it defaults to
+    version - 1 and is only sent for several saves coalesced into one write.
+
+    game_events rows log one save each, keyed on (user_id, save_slot, version):
+    the action's name and details, the player columns it changed and its
+    dungeon_rooms-shaped room records, all as JSON text. With an event log the
+    player_saves and dungeons rows are a snapshot as of
+    player_saves.snapshot_version, and the game is that snapshot plus the
+    events after it.
+    """
+
+    name = 'base'
+    # Whether independent queries gain from running at once (see db.run_concurrently).
+    concurrent_queries = False
+
+    @staticmethod
+    def _select(row, columns=None):
+        """Return a copy of a row limited to columns, or every column when columns is None."""
+        if row is None:
+            return None
+        if columns is None:
+            return dict(row)
+        return {column: row.get(column) for column in columns}
+
+    @staticmethod
+    def _is_full_player(record):
+        """Whether a player record holds every column, as for a new save; partial records only update."""
+        return all(column in record for column in PLAYER_COLUMNS)
+
+    @staticmethod
+    def _base_version(record):
+        """The stored version a player record expects to replace, or None if it carries no version."""
+        if record.get('version') is None:
+            return None
+        return record.get('base_version', record['version'] - 1)
+
+    @classmethod
+    def _is_stale(cls, player_save, record):
+        """Whether a player record was built from a different version than the stored row's."""
+        base_version = cls._base_version(record)
+        if player_save is None or not base_version:
+            return False
+        return (player_save.get('version') or 0) != base_version
+
+    @staticmethod
+    def _apply_events(player_save, dungeon, events):
+        """Fold the game_events rows logged after a snapshot into its player_saves and dungeons rows."""
+        snapshot_version = player_save.get('snapshot_version') or 0
+        rooms = {record['room_id']: dict(record) for record in (dungeon or {}).get('rooms') or ()}
+        for event in sorted(events, key=lambda event: event['version']):
+            if event['version'] <= snapshot_version:
+                continue
+            player_save.update(json.loads(event['player']))
+            for record in json.loads(event['rooms']):
+                rooms.setdefault(record['room_id'], {}).update(record)
+        if dungeon is not None and rooms:
+            dungeon['rooms'] = list(rooms.values())
+
+    # Users
+
+    @abstractmethod
+    def get_user_by_username(self, username: str):
+        """Return the users row for a username, or None."""
+
+    @abstractmethod
+    def get_user_by_email(self, email: str):
+        """Return the users row for an email, or None."""
+
+    @abstractmethod
+    def create_user(self, username: str, email: str, password: str):
+        """Insert a user and return the created row, or None on failure."""
+
+    # Player saves
+
+    @abstractmethod
+    def get_player_save(self, user_id: int, save_slot: int):
+        """Return the player_saves row for a slot, or None."""
+
+    def get_player_save_id(self, user_id: int, save_slot: int):
+        """Return the id of the player_saves row for a slot, or None."""
+        player_save = self.get_player_save(user_id, save_slot)
+        return player_save['id'] if player_save else None
+
+    def load_player_save(self, user_id: int, save_slot: int):
+        """Return the player_saves row for a slot with the events after its snapshot applied, or None."""
+        # The events are fetched alongside the row; _apply_events skips any the snapshot covers.
+        player_save, events = run_concurrently(
+            lambda: self.get_player_save(user_id, save_slot),
+            lambda: self.get_game_events(user_id, save_slot),
+        )
+        if player_save:
+            self._apply_events(player_save, None, events)
+        return player_save
+
+    @abstractmethod
+    def list_player_saves(self, user_id: int):
+        """Return every player_saves row owned by a user."""
+
+    @abstractmethod
+    def save_player(self, record: dict):
+        """
+        Upsert a player_saves row keyed on (user_id, save_slot).
+
+        Existing rows keep the columns a record leaves out, so records from
+        Player.to_changes() update only what changed. Only a full record
+        creates a row; a partial one for a missing save writes nothing.
+
+        Returns:
+            dict: The written row, or None if nothing was written.
+        """
+
+    @abstractmethod
+    def delete_save(self, user_id: int, save_slot: int):
+        """Delete the dungeon, its room rows, the event log and the player save stored in a slot."""
+
+    # Dungeons
+
+    @abstractmethod
+    def get_dungeon(self, user_id: int, save_slot: int, columns=None):
+        """
+        Return the dungeons row for a slot, or None.
+
+        Parameters:
+            columns (tuple): Columns to fetch, such as dungeon.DUNGEON_COLUMNS. Every column when None.
+        """
+
+    @abstractmethod
+    def save_dungeon(self, record: dict):
+        """Upsert a dungeons row keyed on (user_id, save_slot), dropping the previous floor's room rows."""
+
+    @abstractmethod
+    def get_dungeon_rooms(self, user_id: int, save_slot: int):
+        """Return every dungeon_rooms row for a slot."""
+
+    @abstractmethod
+    def get_game_events(self, user_id: int, save_slot: int, after_version: int = 0):
+        """Return the game_events rows for a slot logged after a version, oldest first."""
+
+    # Whole game state
+
+    def load_game_state(self, user_id: int, save_slot: int, dungeon_columns=None, with_rooms=False, with_events=False):
+        """
+        Load a player save together with its dungeon, limited to dungeon_columns when given.
+
+        Parameters:
+            with_rooms (bool): Also fetch the slot's dungeon_rooms rows, returned
+                               under the dungeon row's 'rooms' key.
+            with_events (bool): Apply the game_events logged after the snapshot:
+                                player columns onto the player_saves row and room
+                                records under the dungeon row's 'rooms' key.
+
+        Returns:
+            tuple: (player_save, dungeon) rows, or None if the save does not exist.
+                   The dungeon row is None when the save has no dungeon yet.
+        """
+        player_save, dungeon, rooms, events = run_concurrently(
+            lambda: self.get_player_save(user_id, save_slot),
+            lambda: self.get_dungeon(user_id, save_slot, dungeon_columns),
+            lambda: self.get_dungeon_rooms(user_id, save_slot) if with_rooms else None,
+            lambda: self.get_game_events(user_id, save_slot) if with_events else None,
+        )
+        if not player_save:
+            return None
+        if dungeon and with_rooms:
+            dungeon['rooms'] = rooms
+        if with_events:
+            self._apply_events(player_save, dungeon, events)
+        return player_save, dungeon
+
+    @abstractmethod
+    def save_game_state(self, player_record: dict, dungeon_record: dict):
+        """
+        Atomically upsert a player save and its dungeon.
+
+        The player record may hold only the columns that changed, or only its
+        keys when the player is unchanged, as for save_player().
+
+        Returns:
+            int: The player_saves id, or None if nothing was written.
+        """
+
+    @abstractmethod
+    def save_game_rooms(self, player_record: dict, dungeon_record: dict | None, room_records: list):
+        """
+        Atomically upsert a player save and the dungeon rooms that changed.
+
+        Parameters:
+            dungeon_record (dict): The full dungeons row when the floor is new, which
+                                   also drops the slot's old room rows; None otherwise.
+            room_records (list): dungeon_rooms rows keyed on (user_id, save_slot, room_id).
+                                 Only the state columns present in a record are written.
+
+        Returns:
+            int: The player_saves id, or None if nothing was written.
+        """
+
+    @abstractmethod
+    def save_game_events(self, player_record: dict, dungeon_record: dict | None, event_records: list):
+        """
+        Atomically upsert a player save and append its game_events rows.
+
+        Parameters:
+            player_record (dict): The keys and version, or for a snapshot the full
+                                  row with snapshot_version, which also drops the
+                                  events up to that version.
+            dungeon_record (dict): The full dungeons row for a snapshot; None otherwise.
+            event_records (list): game_events rows, one per save.
+
+        Returns:
+            int: The player_saves id, or None if nothing was written.
+        """
@@ -0,0 +1,171 @@
+import threading
+from datetime import datetime, timezone
+
+from backend.app.storage.base import StaleSaveError, StorageBackend
+
+
+class MemoryStorage(StorageBackend):
+    """Process-local storage for tests, benchmarks and offline development."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}
+        self._player_saves = {}
+        self._dungeons = {}
+        self._dungeon_rooms = {}  # (user_id, save_slot) -> {room_id: row}
+        self._game_events = {}  # (user_id, save_slot) -> {version: row}
+        self._next_user_id = 1
+        self._next_player_save_id = 1
+        self._next_dungeon_id = 1
+
+    def get_user_by_username(self, username):
+        with self._lock:
+            user = next((user for user in self._users.values() if user['username'] == username), None)
+            return dict(user) if user else None
+
+    def get_user_by_email(self, email):
+        with self._lock:
+            user = next((user for user in self._users.values() if user['email'] == email), None)
+            return dict(user) if user else None
+
+    def create_user(self, username, email, password):
+        with self._lock:
+            if any(user['username'] == username or user['email'] == email for user in self._users.values()):
+                return None
+            user = {
+                'id': self._next_user_id,
+                'username': username,
+                'email': email,
+                'password': password,
+            }
+            self._users[user['id']] = user
+            self._next_user_id += 1
+            return dict(user)
+
+    def get_player_save(self, user_id, save_slot):
+        with self._lock:
+            player_save = self._player_saves.get((user_id, save_slot))
+            return dict(player_save) if player_save else None
+
+    def list_player_saves(self, user_id):
+        with self._lock:
+            return [dict(row) for (owner, _), row in self._player_saves.items() if owner == user_id]
+
+    def _upsert_player(self, record):
+        key = (record['user_id'], record['save_slot'])
+        row = self._player_saves.get(key)
+        if self._is_stale(row, record):
+            raise StaleSaveError(f"Save {key} is at version {row.get('version')}, not {self._base_version(record)}.")
+        record = {column: value for column, value in record.items() if column != 'base_version'}
+        if row is None:
+            if not self._is_full_player(record):
+                return None
+            row = {'id': self._next_player_save_id}
+            self._next_player_save_id += 1
+            self._player_saves[key] = row
+        row.update(record)
+        return row
+
+    def save_player(self, record):
+        with self._lock:
+            player_save = self._upsert_player(record)
+            return dict(player_save) if player_save else None
+
+    def delete_save(self, user_id, save_slot):
+        with self._lock:
+            self._dungeons.pop((user_id, save_slot), None)
+            self._dungeon_rooms.pop((user_id, save_slot), None)
+            self._game_events.pop((user_id, save_slot), None)
+            self._player_saves.pop((user_id, save_slot), None)
+
+    def get_dungeon(self, user_id, save_slot, columns=None):
+        with self._lock:
+            return self._select(self._dungeons.get((user_id, save_slot)), columns)
+
+    def _upsert_dungeon(self, record):
+        key = (record['user_id'], record['save_slot'])
+        row = self._dungeons.get(key)
+        if row is None:
+            row = {'id': self._next_dungeon_id}
+            self._next_dungeon_id += 1
+            self._dungeons[key] = row
+        row.update(record)
+        return row
+
+    def _upsert_rooms(self, room_records):
+        for record in room_records:
+            rooms = self._dungeon_rooms.setdefault((record['user_id'], record['save_slot']), {})
+            rooms.setdefault(record['room_id'], {}).update(record)
+
+    def _rooms(self, user_id, save_slot):
+        return [dict(row) for row in self._dungeon_rooms.get((user_id, save_slot), {}).values()]
+
+    def save_dungeon(self, record):
+        with self._lock:
+            self._dungeon_rooms.pop((record['user_id'], record['save_slot']), None)
+            return dict(self._upsert_dungeon(record))
+
+    def get_dungeon_rooms(self, user_id, save_slot):
+        with self._lock:
+            return self._rooms(user_id, save_slot)
+
+    def _events(self, user_id, save_slot, after_version):
+        events = self._game_events.get((user_id, save_slot), {})
+        return [dict(events[version]) for version in sorted(events) if version > after_version]
+
+    def get_game_events(self, user_id, save_slot, after_version=0):
+        with self._lock:
+            return self._events(user_id, save_slot, after_version)
+
+    def load_game_state(self, user_id, save_slot, dungeon_columns=None, with_rooms=False, with_events=False):
+        with self._lock:
+            player_save = self._player_saves.get((user_id, save_slot))
+            if not player_save:
+                return None
+            player_save = dict(player_save)
+            dungeon = self._select(self._dungeons.get((user_id, save_slot)), dungeon_columns)
+            if dungeon and with_rooms:
+                dungeon['rooms'] = self._rooms(user_id, save_slot)
+            if with_events:
+                events = self._events(user_id, save_slot, player_save.get('snapshot_version') or 0)
+                self._apply_events(player_save, dungeon, events)
+            return player_save, dungeon
+
+    def save_game_state(self, player_record, dungeon_record):
+        with self._lock:
+            player_save = self._upsert_player(player_record)
+            if player_save is None:
+                return None
+            self._upsert_dungeon(dict(dungeon_record, player_save_id=player_save['id']))
+            return player_save['id']
+
+    def save_game_rooms(self, player_record, dungeon_record, room_records):
+        with self._lock:
+            player_save = self._upsert_player(player_record)
+            if player_save is None:
+                return None
+            if dungeon_record is not None:
+                self._upsert_dungeon(dict(dungeon_record, player_save_id=player_save['id']))
+                self._dungeon_rooms.pop((dungeon_record['user_id'], dungeon_record['save_slot']), None)
+            self._upsert_rooms(room_records)
+            return player_save['id']
+
+    def save_game_events(self, player_record, dungeon_record, event_records):
+        with self._lock:
+            player_save = self._upsert_player(player_record)
+            if player_save is None:
+                return None
+            key = (player_record['user_id'], player_record['save_slot'])
+            if dungeon_record is not None:
+                self._upsert_dungeon(dict(dungeon_record, player_save_id=player_save['id']))
+                self._dungeon_rooms.pop(key, None)
+            events = self._game_events.setdefault(key, {})
+            created_at = datetime.now(timezone.utc).isoformat()
+            for record in event_records:
+                events[record['version']] = dict(record, player_save_id=player_save['id'], created_at=created_at)
+            if 'snapshot_version' in player_record:
+                for version in [version for version in events if version <= player_record['snapshot_version']]:
+                    del events[version]
+            return player_save['id']
@@ -0,0 +1,289 @@
+import sqlite3
+import threading
+
+from backend.app.storage.base import StaleSaveError, StorageBackend
+
+SCHEMA = """
+create table if not exists users (
+    id integer primary key autoincrement,
+    username text not null unique,
+    email text not null unique,
+    password text not null
+);
+
+create table if not exists player_saves (
+    id integer primary key autoincrement,
+    user_id integer not null,
+    name text,
+    player_class text,
+    level integer,
+    experience integer,
+    health integer,
+    max_health integer,
+    defense integer,
+    inventory text,
+    skills text,
+    dungeon_floor integer,
+    player_location text,
+    save_slot integer not null,
+    version integer,
+    snapshot_version integer,
+    unique (user_id, save_slot)
+);
+
+create table if not exists dungeons (
+    id integer primary key autoincrement,
+    player_save_id integer,
+    user_id integer not null,
+    width integer,
+    height integer,
+    num_rooms integer,
+    room_positions text,
+    connections text,
+    start_location text,
+    exit_location text,
+    merchant_location text,
+    floor_level integer,
+    save_slot integer not null,
+    room_descriptions text,
+    room_enemies text,
+    room_enemy_descriptions text,
+    seed integer,
+    layout_version integer,
+    unique (user_id, save_slot)
+);
+
+create table if not exists dungeon_rooms (
+    id integer primary key autoincrement,
+    player_save_id integer,
+    user_id integer not null,
+    save_slot integer not null,
+    room_id integer not null,
+    room_enemies text,
+    room_descriptions text,
+    room_enemy_descriptions text,
+    unique (user_id, save_slot, room_id)
+);
+
+create table if not exists game_events (
+    id integer primary key autoincrement,
+    player_save_id integer,
+    user_id integer not null,
+    save_slot integer not null,
+    version integer not null,
+    event text not null,
+    details text,
+    player text,
+    rooms text,
+    created_at text default current_timestamp,
+    unique (user_id, save_slot, version)
+);
+"""
+
+ROOM_COLUMNS = ('room_id', 'room_enemies', 'room_descriptions', 'room_enemy_descriptions')
+EVENT_COLUMNS = ('version', 'event', 'details', 'player', 'rooms', 'created_at')
+
+# Columns added after a table was first created, applied to older database files.
+ADDED_COLUMNS = {
+    'player_saves': {
+        'version': 'integer',
+        'snapshot_version': 'integer',
+    },
+    'dungeons': {
+        'seed': 'integer',
+        'layout_version': 'integer',
+    },
+}
+
+
+class SQLiteStorage(StorageBackend):
+    """Single-file storage for local development and load tests without a network."""
+
+    name = 'sqlite'
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+            self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row['name'] for row in self._connection.execute(f'pragma table_info({table})')}
+            for column, column_type in columns.items():
+                if column not in existing:
+                    self._connection.execute(f'alter table {table} add column {column} {column_type}')
+
+    def _fetch_one(self, query, params):
+        with self._lock:
+            row = self._connection.execute(query, params).fetchone()
+        return dict(row) if row else None
+
+    def _insert_or_update(self, table, record, keys=('user_id', 'save_slot'), where=None):
+        columns = list(record)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column not in keys)
+        # A record holding only its keys changes nothing on an existing row.
+        action = f'do update set {updates}' if updates else 'do nothing'
+        if updates and where:
+            action += f' where {where}'
+        return self._connection.execute(
+            f"insert into {table} ({', '.join(columns)}) values ({', '.join('?' for _ in columns)}) "
+            f"on conflict ({', '.join(keys)}) {action}",
+            [record[column] for column in columns],
+        )
+
+    def _upsert(self, table, record, where=None):
+        cursor = self._insert_or_update(table, record, where=where)
+        if where and cursor.rowcount == 0:
+            return None
+        row = self._connection.execute(
+            f'select * from {table} where user_id = ? and save_slot = ?',
+            (record['user_id'], record['save_slot']),
+        ).fetchone()
+        return dict(row)
+
+    def _select_player(self, user_id, save_slot):
+        row = self._connection.execute(
+            'select * from player_saves where user_id = ? and save_slot = ?', (user_id, save_slot)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _update_player(self, record, where):
+        """Update the columns a partial record holds, as upsert_player_save does on Supabase."""
+        key = (record['user_id'], record['save_slot'])
+        columns = [column for column in record if column not in ('user_id', 'save_slot')]
+        if not columns:
+            return self._select_player(*key)
+        cursor = self._connection.execute(
+            f"update player_saves set {', '.join(f'{column} = ?' for column in columns)} "
+            f"where user_id = ? and save_slot = ?" + (f' and {where}' if where else ''),
+            [record[column] for column in columns] + list(key),
+        )
+        if cursor.rowcount == 0:
+            return None
+        return self._select_player(*key)
+
+    def _upsert_player(self, record):
+        base_version = self._base_version(record)
+        key = (record['user_id'], record['save_slot'])
+        record = {column: value for column, value in record.items() if column != 'base_version'}
+        # Only overwrite the save this record was built from; see StorageBackend.
+        where = f'coalesce(player_saves.version, 0) = {int(base_version)}' if base_version else None
+        if self._is_full_player(record):
+            player_save = self._upsert('player_saves', record, where=where)
+        else:
+            player_save = self._update_player(record, where)
+            if player_save is None and self._select_player(*key) is None:
+                # A partial record for a save that does not exist.
+                return None
+        if player_save is None:
+            raise StaleSaveError(f"Save {key} is not at version {base_version}.")
+        return player_save
+
+    def get_user_by_username(self, username):
+        return self._fetch_one('select * from users where username = ?', (username,))
+
+    def get_user_by_email(self, email):
+        return self._fetch_one('select * from users where email = ?', (email,))
+
+    def create_user(self, username, email, password):
+        try:
+            with self._lock, self._connection:
+                cursor = self._connection.execute(
+                    'insert into users (username, email, password) values (?, ?, ?)',
+                    (username, email, password),
+                )
+        except sqlite3.IntegrityError:
+            return None
+        return self._fetch_one('select * from users where id = ?', (cursor.lastrowid,))
+
+    def get_player_save(self, user_id, save_slot):
+        return self._fetch_one('select * from player_saves where user_id = ? and save_slot = ?', (user_id, save_slot))
+
+    def list_player_saves(self, user_id):
+        with self._lock:
+            rows = self._connection.execute('select * from player_saves where user_id = ?', (user_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_player(self, record):
+        with self._lock, self._connection:
+            return self._upsert_player(record)
+
+    def delete_save(self, user_id, save_slot):
+        with self._lock, self._connection:
+            self._delete_rooms(user_id, save_slot)
+            self._connection.execute('delete from game_events where user_id = ? and save_slot = ?', (user_id, save_slot))
+            self._connection.execute('delete from dungeons where user_id = ? and save_slot = ?', (user_id, save_slot))
+            self._connection.execute('delete from player_saves where user_id = ? and save_slot = ?', (user_id, save_slot))
+
+    def get_dungeon(self, user_id, save_slot, columns=None):
+        selected = ', '.join(columns) if columns else '*'
+        return self._fetch_one(f'select {selected} from dungeons where user_id = ? and save_slot = ?', (user_id, save_slot))
+
+    def _delete_rooms(self, user_id, save_slot):
+        self._connection.execute('delete from dungeon_rooms where user_id = ? and save_slot = ?', (user_id, save_slot))
+
+    def save_dungeon(self, record):
+        with self._lock, self._connection:
+            self._delete_rooms(record['user_id'], record['save_slot'])
+            return self._upsert('dungeons', record)
+
+    def get_dungeon_rooms(self, user_id, save_slot):
+        with self._lock:
+            rows = self._connection.execute(
+                f"select {', '.join(ROOM_COLUMNS)} from dungeon_rooms where user_id = ? and save_slot = ?",
+                (user_id, save_slot),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_game_events(self, user_id, save_slot, after_version=0):
+        with self._lock:
+            rows = self._connection.execute(
+                f"select {', '.join(EVENT_COLUMNS)} from game_events "
+                "where user_id = ? and save_slot = ? and version > ? order by version",
+                (user_id, save_slot, after_version),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_game_state(self, player_record, dungeon_record):
+        with self._lock, self._connection:
+            player_save = self._upsert_player(player_record)
+            if player_save is None:
+                return None
+            self._upsert('dungeons', dict(dungeon_record, player_save_id=player_save['id']))
+        return player_save['id']
+
+    def save_game_rooms(self, player_record, dungeon_record, room_records):
+        with self._lock, self._connection:
+            player_save = self._upsert_player(player_record)
+            if player_save is None:
+                return None
+            if dungeon_record is not None:
+                self._delete_rooms(dungeon_record['user_id'], dungeon_record['save_slot'])
+                self._upsert('dungeons', dict(dungeon_record, player_save_id=player_save['id']))
+            for record in room_records:
+                self._insert_or_update('dungeon_rooms', dict(record, player_save_id=player_save['id']),
+                                       keys=('user_id', 'save_slot', 'room_id'))
+        return player_save['id']
+
+    def save_game_events(self, player_record, dungeon_record, event_records):
+        with self._lock, self._connection:
+            player_save = self._upsert_player(player_record)
+            if player_save is None:
+                return None
+            user_id, save_slot = player_record['user_id'], player_record['save_slot']
+            if dungeon_record is not None:
+                self._delete_rooms(user_id, save_slot)
+                self._upsert('dungeons', dict(dungeon_record, player_save_id=player_save['id']))
+            for record in event_records:
+                self._insert_or_update('game_events', dict(record, player_save_id=player_save['id']),
+                                       keys=('user_id', 'save_slot', 'version'))
+            if 'snapshot_version' in player_record:
+                self._connection.execute(
+                    'delete from game_events where user_id = ? and save_slot = ? and version <= ?',
+                    (user_id, save_slot, player_record['snapshot_version']),
+                )
+        return player_save['id']
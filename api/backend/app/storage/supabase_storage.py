@@ -0,0 +1,151 @@
+from backend.app.db import run_concurrently
+from backend.app.storage.base import StaleSaveError, StorageBackend
+
+ROOM_COLUMNS = 'room_id,room_enemies,room_descriptions,room_enemy_descriptions'
+EVENT_COLUMNS = 'version,event,details,player,rooms,created_at'
+SERIALIZATION_FAILURE = '40001'  # Raised by upsert_player_save for a stale version
+
+
+class SupabaseStorage(StorageBackend):
+    """Storage backed by the Supabase tables and the save_game_state, save_game_rooms and save_game_events functions."""
+
+    name = 'supabase'
+    concurrent_queries = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _first(response):
+        return response.data[0] if response.data else None
+
+    def _rpc(self, function, params):
+        try:
+            return self.client.rpc(function, params).execute().data
+        except Exception as exc:
+            if getattr(exc, 'code', None) == SERIALIZATION_FAILURE:
+                raise StaleSaveError(str(exc)) from exc
+            raise
+
+    def get_user_by_username(self, username):
+        return self._first(self.client.table('users').select('*').eq('username', username).execute())
+
+    def get_user_by_email(self, email):
+        return self._first(self.client.table('users').select('*').eq('email', email).execute())
+
+    def create_user(self, username, email, password):
+        response = self.client.table('users').insert({
+            'username': username,
+            'email': email,
+            'password': password,
+        }).execute()
+        return self._first(response)
+
+    def get_player_save(self, user_id, save_slot):
+        return self._first(
+            self.client.table('player_saves').select('*').eq('user_id', user_id).eq('save_slot', save_slot).execute()
+        )
+
+    def get_player_save_id(self, user_id, save_slot):
+        player_save = self._first(
+            self.client.table('player_saves').select('id').eq('user_id', user_id).eq('save_slot', save_slot).execute()
+        )
+        return player_save['id'] if player_save else None
+
+    def list_player_saves(self, user_id):
+        response = self.client.table('player_saves').select('*').eq('user_id', user_id).execute()
+        return response.data or []
+
+    def save_player(self, record):
+        # Goes through the function rather than a table upsert for its version check.
+        player_save_id = self._rpc('upsert_player_save', {'p_player': record})
+        return dict(record, id=player_save_id) if player_save_id is not None else None
+
+    def _delete(self, table, user_id, save_slot):
+        self.client.table(table).delete().eq('user_id', user_id).eq('save_slot', save_slot).execute()
+
+    def delete_save(self, user_id, save_slot):
+        # The rows that reference player_saves go first, in parallel, then the save itself.
+        run_concurrently(
+            lambda: self._delete('game_events', user_id, save_slot),
+            lambda: self._delete('dungeon_rooms', user_id, save_slot),
+            lambda: self._delete('dungeons', user_id, save_slot),
+        )
+        self._delete('player_saves', user_id, save_slot)
+
+    def get_dungeon(self, user_id, save_slot, columns=None):
+        selected = ','.join(columns) if columns else '*'
+        return self._first(
+            self.client.table('dungeons').select(selected).eq('user_id', user_id).eq('save_slot', save_slot).execute()
+        )
+
+    def save_dungeon(self, record):
+        self.client.table('dungeon_rooms').delete().eq('user_id', record['user_id']).eq('save_slot', record['save_slot']).execute()
+        response = self.client.table('dungeons').upsert(record, on_conflict='user_id,save_slot').execute()
+        return self._first(response)
+
+    def get_dungeon_rooms(self, user_id, save_slot):
+        response = self.client.table('dungeon_rooms').select(ROOM_COLUMNS).eq('user_id', user_id).eq('save_slot', save_slot).execute()
+        return response.data or []
+
+    def get_game_events(self, user_id, save_slot, after_version=0):
+        response = (
+            self.client.table('game_events')
+            .select(EVENT_COLUMNS)
+            .eq('user_id', user_id)
+            .eq('save_slot', save_slot)
+            .gt('version', after_version)
+            .order('version')
+            .execute()
+        )
+        return response.data or []
+
+    def load_game_state(self, user_id, save_slot, dungeon_columns=None, with_rooms=False, with_events=False):
+        # The dungeon, room and event rows are embedded through their
+        # player_save_id foreign keys, so everything comes back from one query.
+        selected = ','.join(dungeon_columns) if dungeon_columns else '*'
+        embedded = f'dungeons({selected})' + (f', dungeon_rooms({ROOM_COLUMNS})' if with_rooms else '')
+        if with_events:
+            embedded += f', game_events({EVENT_COLUMNS})'
+        response = (
+            self.client.table('player_saves')
+            .select(f'*, {embedded}')
+            .eq('user_id', user_id)
+            .eq('save_slot', save_slot)
+            .execute()
+        )
+        if not response.data:
+            return None
+
+        player_save = dict(response.data[0])
+        dungeon_rows = player_save.pop('dungeons', None) or []
+        room_rows = player_save.pop('dungeon_rooms', None) or []
+        event_rows = player_save.pop('game_events', None) or []
+        if isinstance(dungeon_rows, dict):
+            dungeon_rows = [dungeon_rows]
+        dungeon = dungeon_rows[0] if dungeon_rows else None
+        if dungeon and with_rooms:
+            dungeon['rooms'] = room_rows
+        if with_events:
+            self._apply_events(player_save, dungeon, event_rows)
+        return player_save, dungeon
+
+    def save_game_state(self, player_record, dungeon_record):
+        return self._rpc('save_game_state', {
+            'p_player': player_record,
+            'p_dungeon': dungeon_record,
+        })
+
+    def save_game_rooms(self, player_record, dungeon_record, room_records):
+        return self._rpc('save_game_rooms', {
+            'p_player': player_record,
+            'p_dungeon': dungeon_record,
+            'p_rooms': room_records,
+        })
+
+    def save_game_events(self, player_record, dungeon_record, event_records):
+        return self._rpc('save_game_events', {
+            'p_player': player_record,
+            'p_dungeon': dungeon_record,
+            'p_events': event_records,
+        })
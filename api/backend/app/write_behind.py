@@ -0,0 +1,178 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from backend.app.session_cache import get_session_cache
+
+WRITE_BEHIND_WORKERS = int(os.getenv("WRITE_BEHIND_WORKERS", "4"))
+# Seconds a request waits for a game's queued writes before giving up.
+FLUSH_TIMEOUT = float(os.getenv("FLUSH_TIMEOUT", "10"))
+
+
+class SaveBusyError(Exception):
+    """Raised when a game's queued writes did not finish within FLUSH_TIMEOUT."""
+
+
+class PendingSave():
+    """
+    One save's storage writes, serialized when the save was made.
+
+    Holds the player_saves record plus either the full dungeons row (row
+    persistence) or the dungeons row for a new floor and the changed
+    dungeon_rooms rows by room id (rooms persistence). With the event log it
+    holds game_events rows instead, plus a snapshot's dungeons row. Later saves
+    of the same game merge into an earlier one, so a burst of actions becomes
+    one write.
+    """
+
+    def __init__(self, rooms_mode: bool, player_record: dict, dungeon_record: dict | None, room_records=(), state=None,
+                 event_records=None):
+        self.rooms_mode = rooms_mode
+        self.player_record = player_record
+        self.dungeon_record = dungeon_record
+        self.room_records = {record['room_id']: record for record in room_records}
+        self.event_records = event_records
+        # (player_saves row, dungeons row) holding the whole game after this
+        # save, for the save journal; only built while the journal is in use.
+        self.state = state
+        self.saves = 1
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(data['rooms_mode'], data['player'], data['dungeon'], data['rooms'], event_records=data.get('events'))
+
+    def to_data(self):
+        """Return the writes as a JSON-ready dict, for the save journal."""
+        return {
+            'rooms_mode': self.rooms_mode,
+            'player': self.player_record,
+            'dungeon': self.dungeon_record,
+            'rooms': list(self.room_records.values()),
+            'events': self.event_records,
+        }
+
+    def merge(self, later):
+        """Fold a later save of the same game into this one."""
+        # The merged record replaces the version this save was built from.
+        base_version = self.player_record.get('base_version', self.player_record['version'] - 1)
+        self.player_record.update(later.player_record)
+        self.player_record['base_version'] = base_version
+
+        if later.dungeon_record is not None:
+            self.dungeon_record = later.dungeon_record
+            if self.rooms_mode:
+                # A new floor's row already holds every room's state.
+                self.room_records = {}
+        for room_id, record in later.room_records.items():
+            self.room_records.setdefault(room_id, {}).update(record)
+        if later.event_records:
+            self.event_records = (self.event_records or []) + later.event_records
+        self.state = later.state or self.state
+        self.saves += later.saves
+
+    def apply(self, storage):
+        """
+        Write the save.
+
+        Returns:
+            int: The player_saves id, or None if nothing was written.
+        """
+        if self.event_records is not None:
+            return storage.save_game_events(self.player_record, self.dungeon_record, self.event_records)
+        if self.rooms_mode:
+            return storage.save_game_rooms(self.player_record, self.dungeon_record, list(self.room_records.values()))
+        if self.dungeon_record is not None:
+            return storage.save_game_state(self.player_record, self.dungeon_record)
+        player_save = storage.save_player(self.player_record)
+        return player_save['id'] if player_save else None
+
+
+class WriteBehindQueue():
+    """
+    Applies saves on a worker pool after the response has gone out.
+
+    Each (user_id, save_slot) has at most one write in flight, so its saves
+    land in the order they were made. Saves submitted while a write is in
+    flight merge into a single pending save that is written next. Writes go
+    through the save journal when one is configured. A failed
+    write drops the game from the session cache so the next request reloads
+    what storage actually holds.
+    """
+
+    def __init__(self, max_workers: int = WRITE_BEHIND_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='write-behind')
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = {}  # (user_id, save_slot) -> PendingSave not yet started
+        self._writing = set()  # Keys with a write in flight
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.failed = 0
+
+    def submit(self, user_id: int, save_slot: int, save: PendingSave):
+        """Queue a save behind any earlier ones for the same game."""
+        key = (user_id, save_slot)
+        with self._lock:
+            self.submitted += 1
+            if key in self._pending:
+                self._pending[key].merge(save)
+                self.coalesced += 1
+                return
+            self._pending[key] = save
+            if key not in self._writing:
+                self._writing.add(key)
+                self._executor.submit(self._drain, key)
+
+    def _drain(self, key):
+        from backend.app.save_journal import write_save
+
+        while True:
+            with self._lock:
+                save = self._pending.pop(key, None)
+                if save is None:
+                    self._writing.discard(key)
+                    self._idle.notify_all()
+                    return
+
+            try:
+                if not write_save(*key, save):
+                    raise RuntimeError('storage wrote nothing')
+            except Exception as e:
+                print(f"Error writing save {key} behind ({save.saves} coalesced): {e}")
+                get_session_cache().invalidate(*key)
+                with self._lock:
+                    self.failed += 1
+            else:
+                with self._lock:
+                    self.written += 1
+
+    def flush(self, user_id: int, save_slot: int, timeout: float | None = FLUSH_TIMEOUT):
+        """
+        Wait until every queued save for a game has been written.
+
+        Raises:
+            SaveBusyError: If the timeout ran out first.
+        """
+        key = (user_id, save_slot)
+        with self._lock:
+            if not self._idle.wait_for(lambda: key not in self._writing, timeout):
+                raise SaveBusyError(f"Queued saves for {key} are still being written")
+
+    def stats(self):
+        """Return the queue counters and the number of games with writes outstanding."""
+        with self._lock:
+            return {
+                'outstanding': len(self._writing),
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'written': self.written,
+                'failed': self.failed,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_write_behind():
+    """Return the process-wide write-behind queue."""
+    return WriteBehindQueue()
@@ -0,0 +1,119 @@
+import os
+import random as rand
+from functools import lru_cache
+
+from backend.game.data_utils import load_json_file, load_progression_index
+
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DESCRIPTIONS = os.path.join(BASE_DIRECTORY, '..', 'data', 'descriptions.json')
+
+
+class ShuffleBag():
+    """
+    Draw items in a random order without repeats.
+
+    Every item is drawn once before any item is drawn again, and a refill never
+    starts with the item that ended the previous round, so two consecutive
+    draws always differ when the bag holds more than one item.
+    """
+
+    def __init__(self, items, rng=rand):
+        self.items = tuple(items)
+        self.rng = rng
+        self._remaining = []
+        self._last = None
+
+    def draw(self):
+        if not self.items:
+            return None
+
+        if not self._remaining:
+            self._remaining = list(self.items)
+            self.rng.shuffle(self._remaining)
+            # Items are popped from the end, so keep the previous draw away from it.
+            if len(self._remaining) > 1 and self._remaining[-1] == self._last:
+                self._remaining[0], self._remaining[-1] = self._remaining[-1], self._remaining[0]
+
+        self._last = self._remaining.pop()
+        return self._last
+
+
+class FloorContent():
+    """
+    The description keys for one floor tier, precompiled into tuples.
+
+    Each key is a path into descriptions.json such as
+    ('floor_1', 'descriptions', '3') or ('floor_1', 'enemies', 'goblin', '2').
+    Dungeons store these keys and resolve_description() turns them into text
+    when a room is rendered.
+    """
+
+    def __init__(self, floor_key, categories, enemies):
+        self.floor_key = floor_key
+        self.categories = categories  # {'descriptions' | 'entrances' | 'exits': (key, ...)}
+        self.enemies = enemies  # {enemy_name: (key, ...)}
+
+    def bag(self, category, rng=rand):
+        """Return a shuffle bag over one category, or None if the tier has none."""
+        texts = self.categories.get(category)
+        return ShuffleBag(texts, rng) if texts else None
+
+    def enemy_bag(self, enemy_name, rng=rand):
+        """Return a shuffle bag over one enemy's descriptions, or None if it has none."""
+        texts = self.enemies.get(enemy_name)
+        return ShuffleBag(texts, rng) if texts else None
+
+
+@lru_cache(maxsize=None)
+def _build_floor_content(floor_key, filename):
+    floor_data = load_json_file(filename).get(floor_key, {})
+    categories = {
+        category: tuple((floor_key, category, text_id) for text_id in texts)
+        for category, texts in floor_data.items()
+        if category != 'enemies' and isinstance(texts, dict)
+    }
+    enemies = {
+        enemy_name: tuple((floor_key, 'enemies', enemy_name, text_id) for text_id in texts)
+        for enemy_name, texts in floor_data.get('enemies', {}).items()
+    }
+    return FloorContent(floor_key, categories, enemies)
+
+
+@lru_cache(maxsize=None)
+def get_floor_content(floor_level, filename=DESCRIPTIONS):
+    """Return the precompiled FloorContent for the tier that covers a floor level."""
+    floor_key = load_progression_index(filename, 'floor_').resolve(floor_level)
+    return _build_floor_content(floor_key, filename)
+
+
+@lru_cache(maxsize=None)
+def get_merchant_lines(filename=DESCRIPTIONS):
+    """Return the description key of every merchant greeting as a tuple."""
+    return tuple(('merchant', text_id) for text_id in load_json_file(filename)['merchant'])
+
+
+@lru_cache(maxsize=4096)
+def _lookup_description(key, filename):
+    text = load_json_file(filename)
+    for part in key:
+        if not isinstance(text, dict) or part not in text:
+            return None
+        text = text[part]
+    return text if isinstance(text, str) else None
+
+
+def resolve_description(description, filename=DESCRIPTIONS):
+    """
+    Return the text for a stored description.
+
+    Parameters:
+        description (list | tuple | str | None): A description key from
+            FloorContent or get_merchant_lines, or text saved before keys were
+            stored, which is returned as-is.
+
+    Returns:
+        str: The description text, or None if the key no longer exists.
+    """
+    if description is None or isinstance(description, str):
+        return description
+    return _lookup_description(tuple(description), filename)
@@ -1,5 +1,6 @@
 import json
 import re
+from bisect import bisect_right
 from functools import lru_cache
 
 
@@ -9,21 +10,43 @@ def load_json_file(path):
         return json.load(file)
 
 
-def resolve_progression_key(data, prefix, level):
-    pattern = re.compile(rf"^{re.escape(prefix)}(\d+)$")
-    available = []
+class ProgressionIndex():
+    """
+    Sorted integer tiers for progression keys such as 'floor_1' or 'level_3'.
+
+    resolve() returns the key of the highest tier at or below a level, or the
+    lowest tier when the level is below every tier.
+    """
+
+    def __init__(self, data, prefix):
+        pattern = re.compile(rf"^{re.escape(prefix)}(\d+)$")
+        available = []
+
+        for key in data:
+            match = pattern.match(str(key))
+            if match:
+                available.append((int(match.group(1)), key))
+
+        if not available:
+            raise KeyError(f"No keys found for prefix '{prefix}'")
 
-    for key in data:
-        match = pattern.match(str(key))
-        if match:
-            available.append((int(match.group(1)), key))
+        available.sort(key=lambda item: item[0])
+        self.levels = tuple(level for level, _ in available)
+        self.keys = tuple(key for _, key in available)
 
-    if not available:
-        raise KeyError(f"No keys found for prefix '{prefix}'")
+    def resolve(self, level):
+        position = bisect_right(self.levels, level)
+        return self.keys[position - 1] if position else self.keys[0]
 
-    available.sort(key=lambda item: item[0])
-    for candidate_level, candidate_key in reversed(available):
-        if level >= candidate_level:
-            return candidate_key
 
-    return available[0][1]
+@lru_cache(maxsize=None)
+def load_progression_index(path, prefix, section=None):
+    """Build the ProgressionIndex for a data file, or for one top-level section of it, once."""
+    data = load_json_file(path)
+    if section is not None:
+        data = data[section]
+    return ProgressionIndex(data, prefix)
+
+
+def resolve_progression_key(data, prefix, level):
+    return ProgressionIndex(data, prefix).resolve(level)
@@ -1,25 +1,80 @@
-from backend.app.db import supabase
-from backend.game.data_utils import load_json_file, resolve_progression_key
+from backend.app.db import DUNGEON_PERSISTENCE, get_storage
+from backend.game.content import get_floor_content, resolve_description
+from backend.game.game_data import get_game_data
+from backend.game.room_state import EnemyState, RoomState
 import os
 import json
 import random as rand
+from array import array
+from functools import partial
 
 BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 DESCRIPTIONS = os.path.join(BASE_DIRECTORY, '..', 'data', 'descriptions.json')
-ENEMIES = os.path.join(BASE_DIRECTORY, '..', 'data', 'enemies.json')
 
 BRANCH_CHANCE = 0.4  # Chance to branch out from the current path
 ADD_CONNECTION_CHANCE = 0.3  # Chance to add extra connections between rooms
 MERCHANT_CHANCE = 0.85  # Chance to add a merchant in the dungeon
 ENEMY_CHANCE = 0.65  # Chance to add an enemy in a room
 
+# Bump whenever generate() draws from the RNG in a different order, since seeded
+# saves rebuild their layout by replaying generation.
+LAYOUT_VERSION = 2
+# Columns holding per-room state that can change after generation.
+ROOM_STATE_COLUMNS = ('room_enemies', 'room_descriptions', 'room_enemy_descriptions')
+
+EMPTY_CELL = -1
+# One bit per open doorway in a cell's direction mask: (bit, dx, dy, direction)
+DIRECTION_BITS = (
+    (1, 0, -1, 'north'),
+    (2, 0, 1, 'south'),
+    (4, 1, 0, 'east'),
+    (8, -1, 0, 'west'),
+)
+BIT_FOR_OFFSET = {(dx, dy): bit for bit, dx, dy, _ in DIRECTION_BITS}
+OPPOSITE_BIT = {1: 2, 2: 1, 4: 8, 8: 4}
+# Every dungeons column that from_record reads, for column-limited selects.
+DUNGEON_COLUMNS = (
+    'width', 'height', 'num_rooms', 'floor_level', 'seed', 'layout_version',
+    'room_positions', 'connections', 'start_location', 'exit_location', 'merchant_location',
+) + ROOM_STATE_COLUMNS
+
+
+class _LazyColumn():
+    """
+    A room state column that is decoded the first time it is read.
+
+    Dungeon._defer_column() parks a loader instead of setting the attribute.
+    The first read runs the loader and stores the result on the instance,
+    which shadows this descriptor from then on, so later reads and writes are
+    plain attribute access.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, dungeon, owner=None):
+        if dungeon is None:
+            return self
+        try:
+            loader = dungeon._column_loaders.pop(self.name)
+        except KeyError:
+            raise AttributeError(self.name) from None
+        value = dungeon.__dict__[self.name] = loader()
+        return value
+
+
 class Dungeon():
-    def __init__(self, width, height, num_rooms, floor_level):
+    room_enemies = _LazyColumn()  # {room_id: RoomState}
+    room_descriptions = _LazyColumn()  # {room_id: description key}
+    room_enemy_descriptions = _LazyColumn()  # {room_id: description key}
+
+    def __init__(self, width, height, num_rooms, floor_level, seed=None):
         self.width = width
         self.height = height
         self.num_rooms = num_rooms
-        self.grid = [[None for _ in range(width)] for _ in range(height)]
-        self.rooms = {}
+        # Row-major cell arrays: the room index in each cell and a bitmask of its open doorways
+        self.grid = array('i', [EMPTY_CELL]) * (width * height)
+        self.direction_masks = bytearray(width * height)
         self.room_positions = {}
         self.room_descriptions = {}
         self.room_enemies = {}
@@ -28,49 +83,162 @@ class Dungeon():
         self.exit_location = []
         self.merchant_location = []
         self.floor_level = floor_level
-        self.previous_description = None
-        self.position_to_id = {}
+        self._description_bags = {}
+        self.last_room_id = None
+        self.seed = seed
+        self.rng = rand.Random(seed)
+        self.layout_changed = False
+        self._generated_state = None
+        self._column_loaders = {}
+        # The stored value of each state column as loaded, reused verbatim on
+        # save when the column was never read.
+        self._stored_columns = {}
+        # dungeon_rooms entries as loaded, {column: {room_id: JSON text}}, applied
+        # over the dungeons row when a column is decoded.
+        self._room_rows = {}
+        # Rooms written to since the last save, per state column.
+        self._changed_rooms = {column: set() for column in ROOM_STATE_COLUMNS}
+        # Whether storage holds a dungeons row for this floor.
+        self.row_saved = False
+
+    def room_state(self, room_id):
+        """Return the RoomState for a room, or an empty one if the room has none."""
+        return self.room_enemies.get(str(room_id)) or RoomState()
+
+    def set_room_state(self, room_id, enemy=None, merchant=None):
+        """Replace a room's state with the given EnemyState and MerchantState."""
+        self.room_enemies[str(room_id)] = RoomState(enemy, merchant)
+        self._changed_rooms['room_enemies'].add(str(room_id))
+
+    def set_room_description(self, room_id, description):
+        """Set the description key for a room."""
+        self.room_descriptions[str(room_id)] = description
+        self._changed_rooms['room_descriptions'].add(str(room_id))
 
     @staticmethod
-    def _extract_enemy_data(room_state):
-        if not room_state or not isinstance(room_state, dict):
-            return None
-        if 'enemy' in room_state:
-            return room_state.get('enemy')
-        required_keys = {'name', 'health', 'max_health', 'defense', 'skills'}
-        if required_keys.issubset(room_state.keys()):
-            return room_state
-        return None
+    def _decode_column(column, values):
+        """Decode one stored state column; room_enemies values become RoomState objects."""
+        if column == 'room_enemies':
+            return {room_id: RoomState.decode(value) for room_id, value in values.items()}
+        return values
 
     @staticmethod
-    def _extract_merchant_data(room_state):
-        if not room_state or not isinstance(room_state, dict):
-            return None
-        return room_state.get('merchant')
+    def _encode_column(column, values):
+        """Encode one state column for storage; the inverse of _decode_column."""
+        if column == 'room_enemies':
+            return {room_id: room.encode() for room_id, room in values.items()}
+        return values
+
+    def _defer_column(self, column, loader, stored=None):
+        """Replace a state column with a loader that runs on first access."""
+        self.__dict__.pop(column, None)
+        self._column_loaders[column] = loader
+        self._stored_columns[column] = stored
+
+    def _column_loaded(self, column):
+        return column in self.__dict__
+
+    def _load_generated_column(self, column, values):
+        """Snapshot a freshly generated column, then apply the stored room delta if there is one."""
+        self._generated_state[column] = {
+            room_id: json.dumps(value) for room_id, value in self._encode_column(column, values).items()
+        }
+        delta = json.loads(self._stored_columns.get(column) or '{}')
+        for room_id in [room_id for room_id, value in delta.items() if value is None]:
+            values.pop(room_id, None)
+            del delta[room_id]
+        values.update(self._decode_column(column, delta))
+        return self._apply_room_rows(column, values)
+
+    def _load_stored_column(self, column):
+        values = self._decode_column(column, json.loads(self._stored_columns[column] or '{}'))
+        return self._apply_room_rows(column, values)
+
+    def _set_room_rows(self, rows):
+        """Keep the non-NULL entries of loaded dungeon_rooms rows for the column loaders."""
+        self._room_rows = {}
+        for row in rows or ():
+            for column in ROOM_STATE_COLUMNS:
+                if row.get(column) is not None:
+                    self._room_rows.setdefault(column, {})[str(row['room_id'])] = row[column]
+
+    def _apply_room_rows(self, column, values):
+        """Overlay the dungeon_rooms entries for a column; a stored null removes the room."""
+        for room_id, stored in self._room_rows.get(column, {}).items():
+            value = json.loads(stored)
+            if value is None:
+                values.pop(room_id, None)
+            else:
+                values.update(self._decode_column(column, {room_id: value}))
+        return values
 
-    def _set_room_state(self, room_id, enemy=None, merchant=None):
-        state = {}
-        if enemy:
-            state['enemy'] = enemy
-        if merchant:
-            state['merchant'] = merchant
-        self.room_enemies[str(room_id)] = state
+    def _column_unchanged(self, column):
+        """Whether a column was never read and has no room rows, so its stored value is still current."""
+        return not self._column_loaded(column) and column not in self._room_rows
 
     def _create_merchant_state(self):
         from backend.game.merchant import Merchant
 
         merchant = Merchant(self)
-        merchant.generate_inventory(self)
-        description = merchant.load_description()
+        merchant.generate_inventory(self, rng=self.rng)
+        description = merchant.load_description(rng=self.rng)
         return merchant.to_state(), description
 
     @classmethod
     def load_from_db(cls, user_id: int, save_slot: int):
         """Load dungeon data from the database."""
-        response = supabase.table('dungeons').select('*').eq('user_id', user_id).eq('save_slot', save_slot).execute()
-        if not response.data:
+        storage = get_storage()
+        dungeon_data = storage.get_dungeon(user_id, save_slot, columns=DUNGEON_COLUMNS)
+        if not dungeon_data:
             return None
-        dungeon_data = response.data[0]
+        if DUNGEON_PERSISTENCE == 'rooms':
+            dungeon_data['rooms'] = storage.get_dungeon_rooms(user_id, save_slot)
+        return cls.from_record(dungeon_data)
+
+    @classmethod
+    def from_record(cls, dungeon_data):
+        """
+        Build a dungeon from a dungeons row.
+
+        Seeded rows only store the generation seed plus the rooms whose state
+        changed since generation, so the layout is rebuilt by regenerating the
+        floor and the stored room deltas are applied on top. Rows written before
+        seeding store the full layout and are decoded as-is.
+
+        The room state columns are decoded lazily, on first access, so actions
+        that never read a column never parse it. dungeon_rooms rows passed under
+        the 'rooms' key are applied over the row's own room state.
+        """
+        if dungeon_data.get('seed') is None:
+            dungeon = cls._from_layout_record(dungeon_data)
+            dungeon._set_room_rows(dungeon_data.get('rooms'))
+            dungeon.row_saved = True
+            return dungeon
+
+        dungeon = cls(
+            width=dungeon_data['width'],
+            height=dungeon_data['height'],
+            num_rooms=dungeon_data['num_rooms'],
+            floor_level=dungeon_data['floor_level'],
+            seed=dungeon_data['seed']
+        )
+        dungeon.generate()
+
+        if dungeon_data.get('layout_version') != LAYOUT_VERSION:
+            # The generator changed since this floor was saved, so the stored
+            # room deltas no longer line up with the regenerated rooms.
+            print(f"Dungeon layout version {dungeon_data.get('layout_version')} is stale; regenerating the floor.")
+            dungeon.layout_changed = True
+            return dungeon
+
+        # generate() left each column deferred; its loader applies these deltas.
+        dungeon._stored_columns = {column: dungeon_data[column] for column in ROOM_STATE_COLUMNS}
+        dungeon._set_room_rows(dungeon_data.get('rooms'))
+        dungeon.row_saved = True
+        return dungeon
+
+    @classmethod
+    def _from_layout_record(cls, dungeon_data):
         dungeon = cls(
             width=dungeon_data['width'],
             height=dungeon_data['height'],
@@ -78,92 +246,191 @@ class Dungeon():
             floor_level=dungeon_data['floor_level']
         )
         dungeon.room_positions = {str(k): tuple(v) for k, v in json.loads(dungeon_data['room_positions']).items()}
-        dungeon.rooms = {str(k): [str(i) for i in v] for k, v in json.loads(dungeon_data['connections']).items()}
+        for room_id, (x, y) in dungeon.room_positions.items():
+            dungeon.grid[y * dungeon.width + x] = int(room_id)
+        for room_id, neighbor_ids in json.loads(dungeon_data['connections']).items():
+            for neighbor_id in neighbor_ids:
+                dungeon._link_rooms(dungeon.room_positions[str(room_id)], dungeon.room_positions[str(neighbor_id)])
         dungeon.start_location = json.loads(dungeon_data['start_location'])
         dungeon.exit_location = json.loads(dungeon_data['exit_location'])
         dungeon.merchant_location = json.loads(dungeon_data['merchant_location']) if dungeon_data['merchant_location'] else None
-        dungeon.room_descriptions = json.loads(dungeon_data['room_descriptions'])
-        dungeon.room_enemies = json.loads(dungeon_data['room_enemies'])
-        dungeon.room_enemy_descriptions = json.loads(dungeon_data['room_enemy_descriptions'])
+        for column in ROOM_STATE_COLUMNS:
+            dungeon._defer_column(column, partial(dungeon._load_stored_column, column), stored=dungeon_data[column])
 
-        dungeon.position_to_id = {tuple(pos): room_id for room_id, pos in dungeon.room_positions.items()}
-        
         return dungeon
 
+    @property
+    def rooms(self):
+        """Room connections as {room_id: [neighbor_ids]}, derived from the direction masks."""
+        return {room_id: list(self.get_valid_directions(room_id).values()) for room_id in self.room_positions}
+
+    def room_at(self, x, y):
+        """Return the string ID of the room at (x, y), or None if the cell is empty or off the grid."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            room_index = self.grid[y * self.width + x]
+            if room_index != EMPTY_CELL:
+                return str(room_index)
+        return None
+
+    def _link_rooms(self, position, neighbor_position):
+        """Open the doorway between two adjacent cells in both directions."""
+        (x, y), (nx, ny) = position, neighbor_position
+        bit = BIT_FOR_OFFSET[(nx - x, ny - y)]
+        self.direction_masks[y * self.width + x] |= bit
+        self.direction_masks[ny * self.width + nx] |= OPPOSITE_BIT[bit]
+
+    def _column_delta(self, column):
+        current = self._encode_column(column, getattr(self, column))
+        generated = self._generated_state[column]
+        delta = {
+            room_id: value
+            for room_id, value in current.items()
+            if generated.get(room_id) != json.dumps(value)
+        }
+        delta.update({room_id: None for room_id in generated if room_id not in current})
+        return delta
+
+    def get_room_state_deltas(self):
+        """Return, per state column, the rooms that changed since generation (None marks a removed room)."""
+        return {
+            column: json.loads(self._stored_columns.get(column) or '{}') if self._column_unchanged(column)
+            else self._column_delta(column)
+            for column in ROOM_STATE_COLUMNS
+        }
+
+    def to_room_records(self, user_id: int, save_slot: int):
+        """
+        Build the dungeon_rooms rows for the rooms changed since the last save.
+
+        Each row holds the changed room's entry of every column it was changed
+        in, as JSON text; 'null' records that the room no longer has an entry.
+
+        Returns:
+            list: One dict per changed room.
+        """
+        records = {}
+        for column, room_ids in self._changed_rooms.items():
+            if not room_ids:
+                continue
+            values = getattr(self, column)
+            for room_id in room_ids:
+                value = values.get(room_id)
+                if value is not None:
+                    value = self._encode_column(column, {room_id: value})[room_id]
+                record = records.setdefault(room_id, {'user_id': user_id, 'save_slot': save_slot, 'room_id': int(room_id)})
+                record[column] = json.dumps(value)
+        return list(records.values())
+
+    def has_changes(self):
+        """Whether this floor or any of its rooms changed since it was loaded or last saved."""
+        return not self.row_saved or any(self._changed_rooms.values())
+
+    def mark_saved(self):
+        """Record that storage now holds this floor and every change made to it."""
+        self.row_saved = True
+        for room_ids in self._changed_rooms.values():
+            room_ids.clear()
+
+    def to_record(self, user_id: int, save_slot: int, layout: bool = False):
+        """
+        Build the dungeons row for this dungeon.
+
+        Parameters:
+            layout (bool): Store the full layout and room state even for a seeded
+                           dungeon, so loading it needs no regeneration.
+        """
+        if layout or self.seed is None or self._generated_state is None:
+            return self._to_layout_record(user_id, save_slot)
+
+        record = {
+            'user_id': user_id,
+            'width': self.width,
+            'height': self.height,
+            'num_rooms': self.num_rooms,
+            'floor_level': self.floor_level,
+            'save_slot': save_slot,
+            'seed': self.seed,
+            'layout_version': LAYOUT_VERSION,
+            # The layout is regenerated from the seed on load.
+            'room_positions': None,
+            'connections': None,
+            'start_location': None,
+            'exit_location': None,
+            'merchant_location': None,
+        }
+        for column in ROOM_STATE_COLUMNS:
+            if self._column_unchanged(column):
+                # Never read since loading, so the stored delta is still current.
+                record[column] = self._stored_columns.get(column) or '{}'
+            else:
+                record[column] = json.dumps(self._column_delta(column))
+        return record
+
+    def _to_layout_record(self, user_id: int, save_slot: int):
+        return {
+            'user_id': user_id,
+            'width': self.width,
+            'height': self.height,
+            'num_rooms': self.num_rooms,
+            'room_positions': json.dumps({str(k): v for k, v in self.room_positions.items()}),
+            'connections': json.dumps({str(k): [str(i) for i in v] for k, v in self.rooms.items()}),
+            'start_location': json.dumps(self.start_location),
+            'exit_location': json.dumps(self.exit_location),
+            'merchant_location': json.dumps(self.merchant_location) if self.merchant_location else None,
+            'floor_level': self.floor_level,
+            'save_slot': save_slot,
+            **{
+                column: self._stored_columns[column]
+                if self._column_unchanged(column) and self._stored_columns.get(column) is not None
+                else json.dumps(self._encode_column(column, getattr(self, column)))
+                for column in ROOM_STATE_COLUMNS
+            },
+        }
+
     def save_to_db(self, player_save_id: int, user_id: int, save_slot: int):
         """Save dungeon data to the database."""
-        response = supabase.table('dungeons').select('*').eq('user_id', user_id).eq('save_slot', save_slot).execute()
-        if not response.data:
-            # Create a new Dungeon entry
-            supabase.table('dungeons').insert({
-                'player_save_id': player_save_id,
-                'user_id': user_id,
-                'width': self.width,
-                'height': self.height,
-                'num_rooms': self.num_rooms,
-                'room_positions': json.dumps({str(k): v for k, v in self.room_positions.items()}),
-                'connections': json.dumps({str(k): [str(i) for i in v] for k, v in self.rooms.items()}),
-                'start_location': json.dumps(self.start_location),
-                'exit_location': json.dumps(self.exit_location),
-                'merchant_location': json.dumps(self.merchant_location) if self.merchant_location else None,
-                'floor_level': self.floor_level,
-                'save_slot': save_slot,
-                'room_descriptions': json.dumps(self.room_descriptions),
-                'room_enemies': json.dumps(self.room_enemies),
-                'room_enemy_descriptions': json.dumps(self.room_enemy_descriptions)
-            }).execute()
-        else:
-            # Update existing Dungeon entry
-            supabase.table('dungeons').update({
-                'width': self.width,
-                'height': self.height,
-                'num_rooms': self.num_rooms,
-                'room_positions': json.dumps({str(k): v for k, v in self.room_positions.items()}),
-                'connections': json.dumps({str(k): [str(i) for i in v] for k, v in self.rooms.items()}),
-                'start_location': json.dumps(self.start_location),
-                'exit_location': json.dumps(self.exit_location),
-                'merchant_location': json.dumps(self.merchant_location) if self.merchant_location else None,
-                'floor_level': self.floor_level,
-                'room_descriptions': json.dumps(self.room_descriptions),
-                'room_enemies': json.dumps(self.room_enemies),
-                'room_enemy_descriptions': json.dumps(self.room_enemy_descriptions)
-            }).eq('user_id', user_id).eq('save_slot', save_slot).execute()
+        record = self.to_record(user_id, save_slot)
+        record['player_save_id'] = player_save_id
+        get_storage().save_dungeon(record)
+        self.mark_saved()
 
     def generate(self):
-        """Generate a dungeon with a mix of linear paths and branching connections."""
-        self.position_to_id = {}  # Initialize the position-to-ID mapping
-
-        start_x, start_y = rand.randint(0, self.width - 1), rand.randint(0, self.height - 1)
-        self.grid[start_y][start_x] = 0
+        """
+        Generate a dungeon with a mix of linear paths and branching connections.
+
+        Every random draw comes from self.rng, seeded from self.seed, so the same
+        seed and dimensions always rebuild the same floor.
+        """
+        if self.seed is None:
+            self.seed = rand.randrange(2 ** 31)
+        self.rng = rand.Random(self.seed)
+        self._description_bags = {}
+
+        start_x, start_y = self.rng.randint(0, self.width - 1), self.rng.randint(0, self.height - 1)
+        self.grid[start_y * self.width + start_x] = 0
         self.room_positions["0"] = (start_x, start_y)
-        self.position_to_id[(start_x, start_y)] = "0"  # Map position to string room ID
-        self.rooms["0"] = []
 
-        stack = [(start_x, start_y, "0")]  # (x, y, room_id as str)
+        stack = [(start_x, start_y)]
         directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]  # Up, Right, Down, Left
         room_id = 1
 
         while stack and len(self.room_positions) < self.num_rooms:
-            x, y, current_id = stack[-1]
-            rand.shuffle(directions)  # Shuffle directions for variety
+            x, y = stack[-1]
+            self.rng.shuffle(directions)  # Shuffle directions for variety
             created_new_room = False
 
             for dx, dy in directions:
                 nx, ny = x + dx, y + dy
                 if (
                     0 <= nx < self.width and 0 <= ny < self.height
-                    and self.grid[ny][nx] is None
+                    and self.grid[ny * self.width + nx] == EMPTY_CELL
                     and len(self.room_positions) < self.num_rooms
                 ):
                     # Create a new room
-                    self.grid[ny][nx] = room_id
-                    str_room_id = str(room_id)
-                    self.room_positions[str_room_id] = (nx, ny)
-                    self.position_to_id[(nx, ny)] = str_room_id  # Map position to string room ID
-                    self.rooms[str_room_id] = []
-                    self.rooms[current_id].append(str_room_id)
-                    self.rooms[str_room_id].append(current_id)
-                    stack.append((nx, ny, str_room_id))
+                    self.grid[ny * self.width + nx] = room_id
+                    self.room_positions[str(room_id)] = (nx, ny)
+                    self._link_rooms((x, y), (nx, ny))
+                    stack.append((nx, ny))
                     room_id += 1
                     created_new_room = True
 
@@ -172,6 +439,7 @@ class Dungeon():
             if not created_new_room:
                 stack.pop()  # Backtrack if no new room was created
 
+        self.last_room_id = str(room_id - 1)  # Room IDs are assigned sequentially from 0
         self.get_room_description(player=None, type_key="descriptions")
         self._connect_extra_paths()
         self.add_start()
@@ -181,43 +449,52 @@ class Dungeon():
         self.place_enemies()
         self.room_enemy_descriptions = {}
         for room_id, room_state in self.room_enemies.items():
-            enemy_data = self._extract_enemy_data(room_state)
-            if enemy_data:
-                self.room_enemy_descriptions[room_id] = self._generate_enemy_description(enemy_data['name'])
+            if room_state.enemy:
+                self.room_enemy_descriptions[room_id] = self._generate_enemy_description(room_state.enemy.name)
+        # Snapshot each column against generation only when it is first read,
+        # so loading a seeded save skips columns the action never touches.
+        self._generated_state = {}
+        self._stored_columns = {}
+        self._room_rows = {}
+        for column in ROOM_STATE_COLUMNS:
+            self._defer_column(column, partial(self._load_generated_column, column, getattr(self, column)))
+            self._changed_rooms[column].clear()
+        self.row_saved = False
 
     def _connect_extra_paths(self):
         """Add extra connections between nearby rooms for more interconnectivity."""
-        for room_id, (x, y) in self.room_positions.items():
+        for x, y in self.room_positions.values():
             for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
                 nx, ny = x + dx, y + dy
-                neighbor_id = next((id for id, pos in self.room_positions.items() if pos == (nx, ny)), None)
+                if not (0 <= nx < self.width and 0 <= ny < self.height):
+                    continue
 
-                if neighbor_id and neighbor_id != room_id and neighbor_id not in self.rooms[room_id]:
+                bit = BIT_FOR_OFFSET[(dx, dy)]
+                if self.grid[ny * self.width + nx] != EMPTY_CELL and not self.direction_masks[y * self.width + x] & bit:
                     # Chance to add an extra connection
                     # 30% chance to add extra connection: higher value = more branching
-                    if rand.random() < ADD_CONNECTION_CHANCE:
-                        self.rooms[room_id].append(neighbor_id)
-                        self.rooms[neighbor_id].append(room_id)
+                    if self.rng.random() < ADD_CONNECTION_CHANCE:
+                        self._link_rooms((x, y), (nx, ny))
 
     def add_start(self):
         """Randomly select a room to be the start location."""
-        start_id = rand.choice(["0", str(max(int(k) for k in self.room_positions.keys()))])
+        start_id = self.rng.choice(["0", self.last_room_id])
         self.start_location = (start_id, self.room_positions[start_id])
 
     def add_exit(self):
         """Randomly select a room to be the exit location."""
-        if self.start_location[0] == str(max(int(k) for k in self.rooms.keys())):
-            exit_id = str(min(int(k) for k in self.rooms.keys()))
+        if self.start_location[0] == self.last_room_id:
+            exit_id = "0"
         else:
-            exit_id = str(max(int(k) for k in self.rooms.keys()))
+            exit_id = self.last_room_id
         self.exit_location = (exit_id, self.room_positions[exit_id])
 
     def add_merchant(self):
         """Randomly select a room to be the merchant location."""
-        if rand.random() < MERCHANT_CHANCE:
+        if self.rng.random() < MERCHANT_CHANCE:
             merchant_candidates = [k for k in self.room_positions.keys() if k not in (self.start_location[0], self.exit_location[0])]
             if merchant_candidates:
-                merchant_id = rand.choice(merchant_candidates)
+                merchant_id = self.rng.choice(merchant_candidates)
                 self.merchant_location = (merchant_id, self.room_positions[merchant_id])
             else:
                 self.merchant_location = None
@@ -227,61 +504,55 @@ class Dungeon():
         self.room_enemies = {}
         merchant_room_id = str(self.merchant_location[0]) if self.merchant_location else None
         try:
-            enemy_data = load_json_file(ENEMIES)
-            floor_key = resolve_progression_key(enemy_data, 'floor_', self.floor_level)
-            enemies_data = enemy_data[floor_key]
+            enemies_data = get_game_data().enemies_for_floor(self.floor_level)
+            enemy_names = list(enemies_data.keys())
 
             for room_id in self.room_positions:
                 if room_id == merchant_room_id:
                     merchant_state, description = self._create_merchant_state()
-                    self._set_room_state(room_id, merchant=merchant_state)
+                    self.set_room_state(room_id, merchant=merchant_state)
                     if description:
-                        self.room_descriptions[str(room_id)] = description
+                        self.set_room_description(room_id, description)
                     continue
 
                 if room_id in (self.start_location[0], self.exit_location[0]):
-                    self._set_room_state(room_id)
+                    self.set_room_state(room_id)
                     continue
 
-                if rand.random() < ENEMY_CHANCE:
-                    enemy_name = rand.choice(list(enemies_data.keys()))
-                    data = enemies_data[enemy_name]
-                    self._set_room_state(room_id, enemy={
-                        "name": enemy_name,
-                        "health": data["health"],
-                        "max_health": data["health"],
-                        "defense": data["defense"],
-                        "skills": data["skills"]
-                    })
+                if self.rng.random() < ENEMY_CHANCE:
+                    enemy_name = self.rng.choice(enemy_names)
+                    self.set_room_state(room_id, enemy=EnemyState.from_template(enemies_data[enemy_name]))
                 else:
-                    self._set_room_state(room_id)
+                    self.set_room_state(room_id)
         except Exception as e:
             print(f"Error placing enemies: {e}")
             for room_id in self.room_positions:
-                self._set_room_state(room_id)
+                self.set_room_state(room_id)
 
 
     def get_valid_directions(self, room_id):
         """Returns the valid directions (north, south, east, west) the player can move in a given room."""
-        room_id = str(room_id).strip('"')
-        if room_id not in self.room_positions:
-            print(f"Invalid room_id: {room_id}")
-            return {}
+        position = self.room_positions.get(room_id)
+        if position is None:
+            room_id = str(room_id).strip('"')
+            position = self.room_positions.get(room_id)
+            if position is None:
+                print(f"Invalid room_id: {room_id}")
+                return {}
+
+        x, y = position
+        cell = y * self.width + x
+        mask = self.direction_masks[cell]
 
         directions = {}
-        x, y = self.room_positions[room_id]
-
-        # Check each direction
-        for dx, dy, direction in [(0, -1, 'north'), (0, 1, 'south'), (1, 0, 'east'), (-1, 0, 'west')]:
-            neighbor_pos = (x + dx, y + dy)
-            neighbor_id = self.position_to_id.get(neighbor_pos)
-            if neighbor_id is not None and neighbor_id in self.rooms.get(room_id, []):
-                directions[direction] = str(neighbor_id)
+        for bit, dx, dy, direction in DIRECTION_BITS:
+            if mask & bit:
+                directions[direction] = str(self.grid[cell + dy * self.width + dx])
 
         return directions
     
     def get_room_description(self, player=None, type_key="descriptions", filename=DESCRIPTIONS):
-        """Retrieve or generate a room description."""
+        """Retrieve or generate a room description, resolved to text."""
         # Use room_id from player or fallback to None
         room_id = str(player.player_location) if player else None
 
@@ -289,51 +560,48 @@ class Dungeon():
         if room_id is None:
             for room_id in self.room_positions.keys():
                 if room_id not in self.room_descriptions:
-                    self.room_descriptions[room_id] = self._generate_room_description(room_id, type_key, filename)
+                    self.set_room_description(room_id, self._generate_room_description(room_id, type_key, filename))
             return None  # No specific description to return during generation
 
-        # If room_id already has a description, return it
-        if room_id in self.room_descriptions:
-            return self.room_descriptions[room_id]
-
         # Generate a new description if one doesn't exist
-        self.room_descriptions[room_id] = self._generate_room_description(room_id, type_key, filename)
-        return self.room_descriptions[room_id]
+        if room_id not in self.room_descriptions:
+            self.set_room_description(room_id, self._generate_room_description(room_id, type_key, filename))
+
+        return resolve_description(self.room_descriptions[room_id], filename) or f"No description found for room {room_id}."
+
+    def get_enemy_description(self, room_id, filename=DESCRIPTIONS):
+        """Return the text describing the enemy in a room, or None if there is none."""
+        return resolve_description(self.room_enemy_descriptions.get(str(room_id)), filename)
+
+    def _draw_description(self, category, filename=DESCRIPTIONS, enemy_name=None):
+        """Draw the next description key from this floor's shuffle bag for a category or enemy, or None if there is none."""
+        key = (filename, category, enemy_name)
+        if key not in self._description_bags:
+            content = get_floor_content(self.floor_level, filename)
+            if enemy_name is None:
+                self._description_bags[key] = content.bag(category, self.rng)
+            else:
+                self._description_bags[key] = content.enemy_bag(enemy_name, self.rng)
+        bag = self._description_bags[key]
+        return bag.draw() if bag else None
 
     def _generate_room_description(self, room_id, type_key, filename):
-        """Helper method to generate a room description."""
+        """Helper method to generate a room description key, or fallback text."""
         try:
-            description_data = load_json_file(filename)
-
-            floor_key = resolve_progression_key(description_data, 'floor_', self.floor_level)
-            if floor_key in description_data and type_key in description_data[floor_key]:
-                descriptions = description_data[floor_key][type_key]
-
-                # Ensure description is not the same as the previous one
-                new_description = self.previous_description
-                attempts = 0
-                while new_description == self.previous_description and attempts < 20:
-                    version = str(rand.randint(1, len(descriptions)))
-                    new_description = descriptions[version]
-                    attempts += 1
-
-                self.previous_description = new_description
-                return new_description
-            else:
+            description = self._draw_description(type_key, filename)
+            if description is None:
+                floor_key = get_floor_content(self.floor_level, filename).floor_key
                 return f"No description found for {type_key} on {floor_key}"
+            return description
         except FileNotFoundError:
             return "Description file not found."
         
     def _generate_enemy_description(self, enemy_name, filename=DESCRIPTIONS):
-        """Generate a random description for a given enemy on this floor."""
+        """Draw a description key for a given enemy on this floor, or fallback text."""
         try:
-            description_data = load_json_file(filename)
-
-            floor_key = resolve_progression_key(description_data, 'floor_', self.floor_level)
-            if floor_key in description_data and "enemies" in description_data[floor_key]:
-                enemy_descriptions = description_data[floor_key]["enemies"].get(enemy_name)
-                if enemy_descriptions:
-                    return rand.choice(list(enemy_descriptions.values()))
+            description = self._draw_description("enemies", filename, enemy_name=enemy_name)
+            if description:
+                return description
         except Exception as e:
             print(f"Error generating enemy description: {e}")
         return f"A {enemy_name} appears!"
@@ -341,17 +609,13 @@ class Dungeon():
     def add_entrance_exit_descriptions(self, filename=DESCRIPTIONS):
         """Add entrance and exit descriptions to the dungeon."""
         try:
-            description_data = load_json_file(filename)
-
-            floor_key = resolve_progression_key(description_data, 'floor_', self.floor_level)
-            if floor_key in description_data:
-                if "entrances" in description_data[floor_key]:
-                    entrance_descriptions = description_data[floor_key]["entrances"]
-                    self.room_descriptions[str(self.start_location[0])] = rand.choice(list(entrance_descriptions.values()))
+            entrance_description = self._draw_description("entrances", filename)
+            if entrance_description:
+                self.set_room_description(self.start_location[0], entrance_description)
             
-                if "exits" in description_data[floor_key]:
-                    exit_descriptions = description_data[floor_key]["exits"]
-                    self.room_descriptions[str(self.exit_location[0])] = rand.choice(list(exit_descriptions.values()))
+            exit_description = self._draw_description("exits", filename)
+            if exit_description:
+                self.set_room_description(self.exit_location[0], exit_description)
         
         except FileNotFoundError:
             print("Description file not found.")
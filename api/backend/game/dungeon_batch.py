@@ -0,0 +1,184 @@
+"""
+Generate many dungeons at once across a process pool.
+
+Used to pre-fill floor pools, to load-test dungeon persistence and to fuzz the
+generator's invariants. Run from the api directory:
+
+    python -m backend.game.dungeon_batch --count 1000 --num-rooms 15 --check
+    python -m backend.game.dungeon_batch --count 50 --floor-level 3 --output floors.jsonl
+"""
+import argparse
+import json
+import os
+import random as rand
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.game.dungeon import DIRECTION_BITS, OPPOSITE_BIT, Dungeon
+
+
+def check_dungeon_invariants(dungeon):
+    """
+    Check a generated dungeon for structural problems.
+
+    Returns:
+        list: Human readable descriptions of every violated invariant.
+    """
+    problems = []
+    room_ids = set(dungeon.room_positions)
+
+    if not room_ids:
+        return ['dungeon has no rooms']
+    if len(room_ids) > dungeon.num_rooms:
+        problems.append(f'{len(room_ids)} rooms generated for num_rooms={dungeon.num_rooms}')
+
+    start_id = str(dungeon.start_location[0]) if dungeon.start_location else None
+    exit_id = str(dungeon.exit_location[0]) if dungeon.exit_location else None
+    if start_id not in room_ids:
+        problems.append(f'start room {start_id} does not exist')
+    if exit_id not in room_ids:
+        problems.append(f'exit room {exit_id} does not exist')
+    if len(room_ids) > 1 and start_id == exit_id:
+        problems.append('start and exit are the same room')
+
+    for room_id, (x, y) in dungeon.room_positions.items():
+        if dungeon.room_at(x, y) != room_id:
+            problems.append(f'room {room_id} is not on the grid at {(x, y)}')
+        mask = dungeon.direction_masks[y * dungeon.width + x]
+        for bit, dx, dy, direction in DIRECTION_BITS:
+            if not mask & bit:
+                continue
+            neighbor_id = dungeon.room_at(x + dx, y + dy)
+            if neighbor_id is None:
+                problems.append(f'room {room_id} has a {direction} doorway into an empty cell')
+            elif not dungeon.direction_masks[(y + dy) * dungeon.width + x + dx] & OPPOSITE_BIT[bit]:
+                problems.append(f'doorway {room_id} -> {neighbor_id} is one-way')
+
+    if start_id in room_ids:
+        reached = {start_id}
+        queue = deque([start_id])
+        while queue:
+            for neighbor_id in dungeon.get_valid_directions(queue.popleft()).values():
+                if neighbor_id not in reached:
+                    reached.add(neighbor_id)
+                    queue.append(neighbor_id)
+        if reached != room_ids:
+            problems.append(f'{len(room_ids - reached)} rooms are unreachable from the start')
+
+    for room_id in room_ids:
+        if room_id not in dungeon.room_enemies:
+            problems.append(f'room {room_id} has no room state')
+        if room_id not in dungeon.room_descriptions:
+            problems.append(f'room {room_id} has no description')
+
+    for room_id in (start_id, exit_id):
+        if dungeon.room_state(room_id).enemy:
+            problems.append(f'room {room_id} is the start or exit but has an enemy')
+
+    if dungeon.merchant_location:
+        merchant_id = str(dungeon.merchant_location[0])
+        if merchant_id in (start_id, exit_id):
+            problems.append(f'merchant is placed in the start or exit room {merchant_id}')
+        if not dungeon.room_state(merchant_id).merchant:
+            problems.append(f'merchant room {merchant_id} has no merchant state')
+
+    return problems
+
+
+def _generate_one(width, height, num_rooms, floor_level, seed, check):
+    dungeon = Dungeon(width, height, num_rooms, floor_level, seed=seed)
+    dungeon.generate()
+    if check:
+        return seed, None, check_dungeon_invariants(dungeon)
+    # A seeded record is only the seed and is regenerated on load, so the
+    # batch returns the materialized floor instead.
+    return seed, dungeon.to_record(user_id=None, save_slot=None, layout=True), []
+
+
+def _run_batch(count, width, height, num_rooms, floor_level, seeds, workers, check):
+    if seeds is None:
+        seeds = [rand.randrange(2 ** 31) for _ in range(count)]
+    seeds = list(seeds)
+    if len(seeds) != count:
+        raise ValueError(f"Got {len(seeds)} seeds for {count} dungeons.")
+    jobs = [(width, height, num_rooms, floor_level, seed, check) for seed in seeds]
+
+    if workers == 0 or len(jobs) <= 1:
+        return [_generate_one(*job) for job in jobs]
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_generate_one, *zip(*jobs), chunksize=chunksize))
+
+
+def generate_dungeons(count, width, height, num_rooms, floor_level, seeds=None, workers=None):
+    """
+    Generate dungeons in parallel and return them serialized.
+
+    Parameters:
+        count (int): Number of dungeons to generate.
+        width, height, num_rooms, floor_level (int): Dungeon parameters, as for Dungeon().
+        seeds (iterable): Seeds to use, exactly one per dungeon. Random seeds when None.
+        workers (int): Process count. None uses every CPU, 0 runs in this process.
+
+    Returns:
+        list: dungeons rows in the full layout form (Dungeon.to_record with
+              layout=True), so storing one skips generation on load. user_id
+              and save_slot are left as None for the caller to fill in.
+
+    Raises:
+        ValueError: If seeds does not hold exactly count seeds.
+    """
+    results = _run_batch(count, width, height, num_rooms, floor_level, seeds, workers, check=False)
+    return [record for _, record, _ in results]
+
+
+def fuzz_dungeons(count, width, height, num_rooms, floor_level, seeds=None, workers=None):
+    """
+    Generate dungeons in parallel and check every one with check_dungeon_invariants.
+
+    Returns:
+        dict: {seed: [problems]} for every dungeon that violated an invariant.
+    """
+    results = _run_batch(count, width, height, num_rooms, floor_level, seeds, workers, check=True)
+    return {seed: problems for seed, _, problems in results if problems}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--height', type=int, default=10)
+    parser.add_argument('--num-rooms', type=int, default=15)
+    parser.add_argument('--floor-level', type=int, default=1)
+    parser.add_argument('--seed', type=int, help='First seed; dungeons use seed, seed + 1, ... for reproducible runs.')
+    parser.add_argument('--workers', type=int, help='Process count (default: every CPU, 0 runs in-process).')
+    parser.add_argument('--check', action='store_true', help='Check invariants instead of printing dungeons.')
+    parser.add_argument('--output', help='Write the serialized dungeons as JSON lines to this file instead of stdout.')
+    args = parser.parse_args(argv)
+
+    seeds = range(args.seed, args.seed + args.count) if args.seed is not None else None
+    dimensions = (args.count, args.width, args.height, args.num_rooms, args.floor_level)
+
+    if args.check:
+        failures = fuzz_dungeons(*dimensions, seeds=seeds, workers=args.workers)
+        for seed, problems in failures.items():
+            print(f"seed {seed}: {'; '.join(problems)}")
+        print(f"{args.count - len(failures)}/{args.count} dungeons passed every invariant.")
+        return 1 if failures else 0
+
+    records = generate_dungeons(*dimensions, seeds=seeds, workers=args.workers)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for record in records:
+            output.write(json.dumps(record) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
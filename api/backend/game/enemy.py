@@ -1,40 +1,38 @@
 import os
 import random as rand
 
-from backend.game.data_utils import load_json_file, resolve_progression_key
+from backend.game.content import get_floor_content, resolve_description
+from backend.game.game_data import get_game_data
 
 BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
-ENEMIES = os.path.join(BASE_DIRECTORY, '..', 'data', 'enemies.json')
-LOOT = os.path.join(BASE_DIRECTORY, '..', 'data', 'loot.json')
 DESCRIPTIONS = os.path.join(BASE_DIRECTORY, '..', 'data', 'descriptions.json')
 
 class Enemy():
-    def __init__(self, name, health, max_health, defense, skills, dungeon, loot=None):
+    def __init__(self, name, health, max_health, defense, skills, dungeon, loot=None, tier=None):
         
         self.name = name
+        self.tier = tier  # enemies.json floor key, None for enemies not built from a template
         self.health = health
         self.max_health = max_health
         self.defense = defense
         self.skills = skills
         self.loot = loot if loot is not None else self.load_loot(dungeon)
-        self.previous_description = None
+        self._description_bag = None
 
     @classmethod
-    def create_enemy(cls, enemy_name, dungeon, filename=ENEMIES):
+    def create_enemy(cls, enemy_name, dungeon):
         """Loads enemy data to create an enemy."""
         try:
-            enemy_data = load_json_file(filename)
-            
-            floor_key = resolve_progression_key(enemy_data, 'floor_', dungeon.floor_level)
-            if floor_key in enemy_data and enemy_name in enemy_data[floor_key]:
-                data = enemy_data[floor_key][enemy_name]
+            template = get_game_data().enemy(dungeon.floor_level, enemy_name)
+            if template is not None:
                 return cls(
                     enemy_name,
-                    data['health'],
-                    data['health'],
-                    data['defense'],
-                    data['skills'],
-                    dungeon
+                    template.health,
+                    template.health,
+                    template.defense,
+                    template.skill_dicts(),
+                    dungeon,
+                    tier=template.tier
                 )
             else:
                 print(f"Enemy '{enemy_name}' not found in data.")
@@ -43,13 +41,12 @@ class Enemy():
             print('Enemy data file not found.')
             return None
 
-    def load_loot(self, dungeon, filename=LOOT, default_min=0, default_max=2, gear_chance=0.25, max_gear=2, gold_range=(0, 10)):
+    def load_loot(self, dungeon, default_min=0, default_max=2, gear_chance=0.25, max_gear=2, gold_range=(0, 10)):
         """
         Loads loot data and assigns random loot to the enemy.
         
         Parameters:
             dungeon (Dungeon): The current dungeon object.
-            filename (str): Path to the loot table file.
             default_min (int): Min number of default drop item types.
             default_max (int): Max number of default drop item types.
             gear_chance (float): Chance (0.0 - 1.0) of dropping gear.
@@ -60,29 +57,28 @@ class Enemy():
             dict: A dictionary of dropped items.
         """
         try:
-            loot_data = load_json_file(filename)
+            game_data = get_game_data()
+            item_table = game_data.items_for_floor(dungeon.floor_level)
+            gear_table = game_data.gear_for_floor(dungeon.floor_level)
 
             loot_drops = {}
 
-            # Determine the loot level based on the dungeon floor
-            level_key = resolve_progression_key(loot_data['items'], 'level_', dungeon.floor_level)
-
             # Random number of different default items
             num_items = rand.randint(default_min, default_max)
-            selected_items = rand.sample(loot_data['items'][level_key], min(num_items, len(loot_data['items'][level_key])))
+            selected_items = rand.sample(item_table, min(num_items, len(item_table)))
 
             for item in selected_items:
-                if item['name'] == 'gold':
-                    loot_drops[item['name']] = rand.randint(*gold_range)  # Random gold amount.
+                if item.name == 'gold':
+                    loot_drops[item.name] = rand.randint(*gold_range)  # Random gold amount.
                 else:
-                    loot_drops[item['name']] = rand.randint(1, 3)  # Random amount for other items
+                    loot_drops[item.name] = rand.randint(1, 3)  # Random amount for other items
 
             if rand.random() < gear_chance:
                 num_gear = rand.randint(1, max_gear)
-                gear_drops = rand.sample(loot_data["gear"][level_key], min(num_gear, len(loot_data['gear'][level_key])))
+                gear_drops = rand.sample(gear_table, min(num_gear, len(gear_table)))
                 
                 for gear in gear_drops:
-                    loot_drops[gear['name']] = gear
+                    loot_drops[gear.name] = gear.to_dict()
             
             return loot_drops
 
@@ -139,26 +135,13 @@ class Enemy():
     def load_description(self, player, filename=DESCRIPTIONS):
         """Loads and returns a non-repeating string based on the floor and enemy."""
         try:
-            description_data = load_json_file(filename)
-
-            floor_key = resolve_progression_key(description_data, 'floor_', player.dungeon_floor)
-            enemy_key = self.name
+            if self._description_bag is None:
+                content = get_floor_content(player.dungeon_floor, filename)
+                self._description_bag = content.enemy_bag(self.name)
+                if self._description_bag is None:
+                    return f"No description found for {self.name} on {content.floor_key}."
 
-            if floor_key in description_data and enemy_key in description_data[floor_key]['enemies']:
-                descriptions = description_data[floor_key]['enemies'][enemy_key]
-
-                # Ensure description is not the same as previous one
-                new_description = self.previous_description
-                attempts = 0
-                while new_description == self.previous_description and attempts < 10:
-                    version = str(rand.randint(1, len(descriptions)))
-                    new_description = descriptions[version]
-                    attempts += 1
-
-                self.previous_description = new_description
-                return new_description
-            else:
-                return f"No description found for {enemy_key} on {floor_key}."
+            return resolve_description(self._description_bag.draw(), filename)
 
         except FileNotFoundError:
             return False
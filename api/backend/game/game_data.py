@@ -0,0 +1,158 @@
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from backend.game.content import get_floor_content, get_merchant_lines
+from backend.game.data_utils import load_json_file, load_progression_index
+
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CLASS_SKILLS = os.path.join(BASE_DIRECTORY, '..', 'data', 'class_skills.json')
+ENEMIES = os.path.join(BASE_DIRECTORY, '..', 'data', 'enemies.json')
+LOOT = os.path.join(BASE_DIRECTORY, '..', 'data', 'loot.json')
+DESCRIPTIONS = os.path.join(BASE_DIRECTORY, '..', 'data', 'descriptions.json')
+
+
+class Skill(NamedTuple):
+    name: str
+    damage: int
+
+    def to_dict(self):
+        return {'name': self.name, 'damage': self.damage}
+
+
+class Item(NamedTuple):
+    name: str
+    value: int
+    tier: str
+    is_gear: bool
+    attack: Optional[int] = None  # None when the loot table leaves the stat out
+    defense: Optional[int] = None
+
+    @property
+    def slot(self):
+        """The equipment slot this item goes in, 'weapon' when attack is at least defense."""
+        return 'weapon' if (self.attack or 0) >= (self.defense or 0) else 'armor'
+
+    def to_dict(self):
+        """Return the item as a mutable dict shaped like its loot.json entry."""
+        item = {'name': self.name, 'value': self.value}
+        if self.attack is not None:
+            item['attack'] = self.attack
+        if self.defense is not None:
+            item['defense'] = self.defense
+        return item
+
+
+class EnemyTemplate(NamedTuple):
+    name: str
+    tier: str
+    health: int
+    defense: int
+    skills: tuple  # (Skill, ...)
+
+    def skill_dicts(self):
+        return [skill.to_dict() for skill in self.skills]
+
+
+def _freeze_skills(skills):
+    return tuple(Skill(skill['name'], skill['damage']) for skill in skills)
+
+
+def _freeze_items(entries, tier, is_gear):
+    return tuple(
+        Item(
+            name=entry['name'],
+            value=entry.get('value', 0),
+            tier=tier,
+            is_gear=is_gear,
+            attack=entry.get('attack'),
+            defense=entry.get('defense'),
+        )
+        for entry in entries
+    )
+
+
+class GameData():
+    """
+    Read-only, name-indexed view of the static game data files.
+
+    Built once per process by get_game_data(). Every structure is a tuple,
+    NamedTuple or MappingProxyType, so callers can share it without copying.
+    Tier lists keep their order from the data files, so sampling from them
+    draws the same items as sampling from the raw JSON lists.
+    """
+
+    def __init__(self, class_skills=CLASS_SKILLS, enemies=ENEMIES, loot=LOOT, descriptions=DESCRIPTIONS):
+        self.descriptions_file = descriptions
+
+        self.class_skills = MappingProxyType({
+            player_class: _freeze_skills(skills)
+            for player_class, skills in load_json_file(class_skills).items()
+        })
+
+        self.enemies = MappingProxyType({
+            tier: MappingProxyType({
+                name: EnemyTemplate(name, tier, data['health'], data['defense'], _freeze_skills(data['skills']))
+                for name, data in tier_enemies.items()
+            })
+            for tier, tier_enemies in load_json_file(enemies).items()
+        })
+        self._enemy_tiers = load_progression_index(enemies, 'floor_')
+
+        loot_data = load_json_file(loot)
+        self.items = MappingProxyType({
+            tier: _freeze_items(entries, tier, is_gear=False) for tier, entries in loot_data['items'].items()
+        })
+        self.gear = MappingProxyType({
+            tier: _freeze_items(entries, tier, is_gear=True) for tier, entries in loot_data['gear'].items()
+        })
+        self._loot_tiers = load_progression_index(loot, 'level_', 'items')
+
+        # Items that appear in several tiers (gold, health potion) resolve to their lowest tier.
+        items_by_name = {}
+        for category in (self.gear, self.items):
+            for tier_items in category.values():
+                for item in tier_items:
+                    items_by_name.setdefault(item.name, item)
+        self.items_by_name = MappingProxyType(items_by_name)
+
+    def item(self, name):
+        """Return the Item with this name, or None."""
+        return self.items_by_name.get(name)
+
+    def skills_for_class(self, player_class):
+        return self.class_skills.get(player_class, ())
+
+    def enemy_tier(self, floor_level):
+        return self._enemy_tiers.resolve(floor_level)
+
+    def enemies_for_floor(self, floor_level):
+        """Return {name: EnemyTemplate} for the tier that covers a floor level."""
+        return self.enemies[self.enemy_tier(floor_level)]
+
+    def enemy(self, floor_level, name):
+        """Return the EnemyTemplate for an enemy on a floor, or None."""
+        return self.enemies_for_floor(floor_level).get(name)
+
+    def loot_tier(self, floor_level):
+        return self._loot_tiers.resolve(floor_level)
+
+    def items_for_floor(self, floor_level):
+        return self.items[self.loot_tier(floor_level)]
+
+    def gear_for_floor(self, floor_level):
+        return self.gear[self.loot_tier(floor_level)]
+
+    def floor_content(self, floor_level):
+        """Return the precompiled FloorContent descriptions for a floor level."""
+        return get_floor_content(floor_level, self.descriptions_file)
+
+    def merchant_lines(self):
+        return get_merchant_lines(self.descriptions_file)
+
+
+@lru_cache(maxsize=None)
+def get_game_data():
+    """Return the process-wide GameData registry, loading the data files on first use."""
+    return GameData()
@@ -0,0 +1,146 @@
+INVENTORY_FORMAT = 2  # Stored as "v" in the serialized inventory
+MAX_EQUIPMENT = 5
+EQUIPMENT_SLOTS = ('weapon', 'armor')
+STARTING_STACKS = {'gold': 5, 'health potion': 3}
+
+
+class Inventory():
+    """
+    A player's carried items.
+
+    stacks holds counted items such as gold and potions, equipment is an
+    insertion-ordered set of gear names (a dict with None values) and equipped
+    binds each slot in EQUIPMENT_SLOTS to an owned gear name or None. Every
+    lookup is a dict hit. version goes up on each change so derived views can
+    tell when they are stale.
+    """
+
+    def __init__(self, stacks=None, equipment=(), equipped=None):
+        self.stacks = {name: int(count) for name, count in (stacks or {}).items()}
+        self.equipment = dict.fromkeys(equipment)
+        self.equipped = dict.fromkeys(EQUIPMENT_SLOTS)
+        for slot, item_name in (equipped or {}).items():
+            if slot in self.equipped and item_name in self.equipment:
+                self.equipped[slot] = item_name
+        self.version = 0
+
+    @classmethod
+    def starting(cls):
+        """Return the inventory a new character begins with."""
+        return cls(STARTING_STACKS)
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Build an inventory from its serialized form.
+
+        Parameters:
+            data (dict): Output of to_data(), a legacy free-form inventory dict, or None.
+
+        Returns:
+            Inventory: The decoded inventory, or a starting inventory for None.
+        """
+        if data is None:
+            return cls.starting()
+        if data.get('v') == INVENTORY_FORMAT:
+            return cls(data.get('stacks'), data.get('equipment', ()), data.get('equipped'))
+        return cls._from_legacy(data)
+
+    @classmethod
+    def _from_legacy(cls, data):
+        """Decode the pre-versioned dict mixing counts, an equipment list and an equipped dict or list."""
+        stacks = {
+            name: count for name, count in data.items()
+            if name not in ('equipment', 'equipped', 'health_potions') and isinstance(count, int)
+        }
+        stacks['gold'] = int(data.get('gold', 0))
+        stacks['health potion'] = int(data.get('health potion', 0)) + int(data.get('health_potions', 0))
+
+        equipment = [
+            item['name'] if isinstance(item, dict) and 'name' in item else item
+            for item in data.get('equipment', [])
+        ]
+
+        equipped = data.get('equipped') or {}
+        if isinstance(equipped, list):
+            equipped = {'weapon': equipped[0] if equipped else None, 'armor': equipped[1] if len(equipped) > 1 else None}
+
+        return cls(stacks, equipment, equipped)
+
+    def to_data(self):
+        """Return the compact versioned form stored in player_saves.inventory, dropping empty loot stacks."""
+        data = {
+            'v': INVENTORY_FORMAT,
+            'stacks': {name: count for name, count in self.stacks.items() if count > 0 or name in STARTING_STACKS},
+        }
+        if self.equipment:
+            data['equipment'] = list(self.equipment)
+        equipped = {slot: item_name for slot, item_name in self.equipped.items() if item_name}
+        if equipped:
+            data['equipped'] = equipped
+        return data
+
+    def to_summary(self):
+        """Return the flat dict shape used by the JSON API: counts plus equipment and equipped."""
+        summary = dict(self.stacks)
+        summary['equipment'] = list(self.equipment)
+        summary['equipped'] = dict(self.equipped)
+        return summary
+
+    @property
+    def gold(self):
+        return self.stacks.get('gold', 0)
+
+    def count(self, item_name):
+        return self.stacks.get(item_name, 0)
+
+    def has(self, item_name, amount=1):
+        """Check for at least amount of a stacked item, or for owned gear."""
+        if item_name in self.stacks:
+            return self.stacks[item_name] >= amount
+        return item_name in self.equipment
+
+    def has_equipment(self, item_name):
+        return item_name in self.equipment
+
+    def add_stack(self, item_name, amount=1):
+        self.stacks[item_name] = self.stacks.get(item_name, 0) + max(amount, 0)
+        self.version += 1
+
+    def remove_stack(self, item_name, amount=1):
+        """Remove amount of a stacked item. Returns False and changes nothing if there are too few."""
+        if self.stacks.get(item_name, 0) < amount:
+            return False
+        self.stacks[item_name] -= amount
+        self.version += 1
+        return True
+
+    def add_equipment(self, item_name):
+        """Add a gear item. Returns False if it is already owned or the pack is full."""
+        if item_name in self.equipment or len(self.equipment) >= MAX_EQUIPMENT:
+            return False
+        self.equipment[item_name] = None
+        self.version += 1
+        return True
+
+    def remove_equipment(self, item_name):
+        """Remove a gear item, unequipping it first. Returns False if it is not owned."""
+        if item_name not in self.equipment:
+            return False
+        del self.equipment[item_name]
+        for slot, equipped_item in self.equipped.items():
+            if equipped_item == item_name:
+                self.equipped[slot] = None
+        self.version += 1
+        return True
+
+    def equipped_in(self, slot):
+        return self.equipped.get(slot)
+
+    def equip(self, slot, item_name):
+        """Bind owned gear to a slot, replacing whatever was there. None clears the slot."""
+        if item_name is not None and item_name not in self.equipment:
+            return False
+        self.equipped[slot] = item_name
+        self.version += 1
+        return True
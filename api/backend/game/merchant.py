@@ -1,37 +1,20 @@
 import os
 import random as rand
 
-from backend.game.data_utils import load_json_file, resolve_progression_key
+from backend.game.content import ShuffleBag, get_merchant_lines, resolve_description
+from backend.game.game_data import get_game_data
+from backend.game.room_state import MerchantState
 
 BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
-LOOT = os.path.join(BASE_DIRECTORY, '..', 'data', 'loot.json')
 DESCRIPTIONS = os.path.join(BASE_DIRECTORY, '..', 'data', 'descriptions.json')
 
 
-def _load_loot_data(filename=LOOT):
-    return load_json_file(filename)
-
-
 class Merchant():
     def __init__(self, dungeon, inventory=None, gold_amount=None, description=None):
         self.inventory = inventory if inventory is not None else []
         self.gold_amount = gold_amount if gold_amount is not None else 30 * dungeon.floor_level
-        self.description = description
-        self.previous_description = None
-
-    @staticmethod
-    def _find_item_data(item_name, loot_data):
-        for item_list in loot_data['items'].values():
-            for item in item_list:
-                if item['name'] == item_name:
-                    return dict(item)
-
-        for gear_list in loot_data['gear'].values():
-            for gear in gear_list:
-                if gear['name'] == item_name:
-                    return dict(gear)
-
-        return None
+        self.description = description  # Description key, or text from older saves
+        self._description_bag = None
 
     @staticmethod
     def _merge_item(inventory, item_data):
@@ -45,68 +28,59 @@ class Merchant():
 
         inventory.append(dict(item_data))
 
-    def generate_inventory(self, dungeon, filename=LOOT, max_items=3, max_gear=4):
+    def generate_inventory(self, dungeon, max_items=3, max_gear=4, rng=rand):
         """
         Generates a random inventory for the merchant based on the loot table.
         
         Parameters:
-            filename (str): Path to the loot table file.
             max_items (int): Maximum number of consumable items.
             max_gear (int): Maximum number of gear items.
+            rng (random.Random): Source of randomness, e.g. the dungeon's seeded RNG.
         """
         try:
-            loot_data = _load_loot_data(filename)
+            game_data = get_game_data()
 
-            # Determine the loot level based on the dungeon floor
-            level_key = resolve_progression_key(loot_data['items'], 'level_', dungeon.floor_level)
-            
             # Only generate health potions for items
             health_potions = [
-                item for item in loot_data['items'][level_key] if item['name'] == 'health potion'
+                item for item in game_data.items_for_floor(dungeon.floor_level) if item.name == 'health potion'
             ]
             if health_potions:
-                health_potion = dict(health_potions[0])  # Copy so the source loot table is not mutated
-                health_potion['quantity'] = rand.randint(1, max_items)  # Random quantity between 1 and max_items
+                health_potion = health_potions[0].to_dict()
+                health_potion['quantity'] = rng.randint(1, max_items)  # Random quantity between 1 and max_items
                 items = [health_potion]
             else:
                 items = []
 
-            gear = [
-                dict(item)
-                for item in rand.sample(loot_data['gear'][level_key], min(max_gear, len(loot_data['gear'][level_key])))
-            ]
+            gear_table = game_data.gear_for_floor(dungeon.floor_level)
+            gear = [item.to_dict() for item in rng.sample(gear_table, min(max_gear, len(gear_table)))]
 
             self.inventory = items + gear
 
         except FileNotFoundError:
             print('Loot data file not found.')
 
-    def load_description(self, filename=DESCRIPTIONS):
-        """Loads and returns a non-repeating string of the merchant appearing."""
+    def load_description(self, filename=DESCRIPTIONS, rng=rand):
+        """Draws and returns the key of a non-repeating merchant greeting."""
         try:
-            description_data = load_json_file(filename)
-
-            descriptions = description_data['merchant']
+            if self._description_bag is None:
+                self._description_bag = ShuffleBag(get_merchant_lines(filename), rng)
 
-            new_description = self.previous_description
-            attempts = 0
-            while new_description == self.previous_description and attempts < 10:
-                version = str(rand.randint(1, len(descriptions)))
-                new_description = descriptions[version]
-                attempts += 1
-
-            self.previous_description = new_description
-            self.description = new_description
-            return new_description
+            self.description = self._description_bag.draw()
+            return self.description
         except FileNotFoundError:
             return False
 
+    @property
+    def description_text(self):
+        return resolve_description(self.description)
+
+    @classmethod
+    def from_state(cls, dungeon, state, description=None):
+        """Build a merchant from a room's MerchantState, sharing its inventory list."""
+        return cls(dungeon, inventory=state.inventory, gold_amount=state.gold_amount, description=description)
+
     def to_state(self):
-        return {
-            'inventory': [dict(item) for item in self.inventory],
-            'gold_amount': self.gold_amount,
-            'description': self.description,
-        }
+        return MerchantState([dict(item) for item in self.inventory], self.gold_amount, self.description)
 
     def sell_item_to_player(self, item_name, player):
         """
@@ -122,7 +96,7 @@ class Merchant():
         for item in self.inventory:
             if item['name'] == item_name:
                 item_value = item.get('value', 0)
-                if player.inventory['gold'] >= item_value:
+                if player.inventory.gold >= item_value:
                     item_to_add = dict(item) if any(key in item for key in ('attack', 'defense')) else item_name
                     if not player.add_item_to_inventory(item_to_add, 1):
                         return {
@@ -130,7 +104,7 @@ class Merchant():
                             'message': 'You cannot carry that item right now.',
                         }
 
-                    player.inventory['gold'] -= item_value
+                    player.remove_item_from_inventory('gold', item_value)
                     self.gold_amount += item_value
 
                     # Decrease quantity or remove item if quantity reaches 0
@@ -166,34 +140,33 @@ class Merchant():
         Returns:
             dict: Transaction result.
         """
-        loot_data = _load_loot_data()
         if item_name == 'gold':
             return {
                 'success': False,
                 'message': "The merchant refuses to buy gold.",
             }
 
-        item_data = self._find_item_data(item_name, loot_data)
-        if item_data is None:
+        item = get_game_data().item(item_name)
+        if item is None:
             return {
                 'success': False,
                 'message': "The merchant has no interest in that item.",
             }
 
-        item_value = item_data.get('value', 0)
+        item_value = item.value
         if self.gold_amount < item_value:
             return {
                 'success': False,
                 'message': "The merchant can't afford that right now.",
             }
 
-        if item_name in player.inventory['equipment']:
+        if player.inventory.has_equipment(item_name):
             if not player.remove_item_from_inventory(item_name):
                 return {
                     'success': False,
                     'message': "You don't have that equipment anymore.",
                 }
-            self._merge_item(self.inventory, item_data)
+            self._merge_item(self.inventory, item.to_dict())
         else:
             if not player.remove_item_from_inventory(item_name):
                 return {
@@ -207,7 +180,7 @@ class Merchant():
             })
 
         self.gold_amount -= item_value
-        player.inventory['gold'] += item_value
+        player.add_item_to_inventory('gold', item_value)
         return {
             'success': True,
             'message': f"You sold {item_name} for {item_value} gold.",
@@ -1,17 +1,75 @@
-from backend.app.db import supabase
-from backend.game.data_utils import load_json_file
+from backend.app.db import get_storage
+from backend.game.game_data import get_game_data
+from backend.game.inventory import EQUIPMENT_SLOTS, Inventory
+from functools import cached_property
 import json
-import os
 
-BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
-CLASS_SKILLS = os.path.join(BASE_DIRECTORY, '..', 'data', 'class_skills.json')
-LOOT = os.path.join(BASE_DIRECTORY, '..', 'data', 'loot.json')
+# player_saves column written for each tracked attribute.
+RECORD_COLUMNS = {
+    'name': 'name',
+    'player_class': 'player_class',
+    'level': 'level',
+    'experience': 'experience',
+    'health': 'health',
+    'max_health': 'max_health',
+    'base_defense': 'defense',
+    'inventory': 'inventory',
+    'skills': 'skills',
+    'dungeon_floor': 'dungeon_floor',
+    'player_location': 'player_location',
+}
+
+
+_UNSET = object()
+
+
+class PlayerView():
+    """
+    Inventory and equipment stats derived from a player, for rendering.
+
+    Built on demand by Player.view() and rebuilt once the inventory's version
+    moves on, so each section is computed at most once per inventory change.
+    """
+
+    def __init__(self, player):
+        self._player = player
+        self.version = player.inventory.version
+        self.bonuses = player.get_equipment_bonuses()
+        self.attack_bonus = self.bonuses['attack']
+        self.gold = player.inventory.gold
+
+    @cached_property
+    def inventory_items(self):
+        return self._player.get_inventory_items()
+
+    @cached_property
+    def equipment_details(self):
+        return self._player.get_equipment_details()
+
+    @cached_property
+    def equipped_loadout(self):
+        return self._player.get_equipped_loadout()
+
 
 class Player():
+    """
+    A player character.
+
+    Assigning an attribute listed in RECORD_COLUMNS marks its column changed,
+    and inventory changes are detected through the inventory's version, so a
+    save can send only the columns that changed since the player was loaded
+    or last saved. record_version is the player_saves version last loaded or
+    written; every save sends the next one.
+    """
+
     def __init__(self, name: str, player_class: str, level=1, experience=0, health=20, max_health=20,
                  defense=3, inventory=None, skills=None, dungeon_floor=1, player_location=None,
                  save_slot = None):
 
+        self._changed_fields = set()
+        self._saved_inventory_version = None
+        self._record_saved = False
+        self.record_version = 0
         self.name = name
         self.player_class = player_class
         self.level = level
@@ -19,127 +77,97 @@ class Player():
         self.health = health
         self.max_health = max_health
         self.base_defense = defense
-        self.inventory = self.normalize_inventory(inventory)
+        self.inventory = inventory if isinstance(inventory, Inventory) else Inventory.from_data(inventory)
         self.skills = skills if skills is not None else self.load_skills(player_class)
         self.dungeon_floor = dungeon_floor
         self.player_location = player_location
         self.save_slot = save_slot
         self.defense = self.base_defense
+        self._view = None
         self.refresh_combat_stats()
 
+    def __setattr__(self, name, value):
+        if name in RECORD_COLUMNS and self.__dict__.get(name, _UNSET) != value:
+            self._changed_fields.add(name)
+        object.__setattr__(self, name, value)
+
     @classmethod
     def load_or_create_player(cls, user_id: int, save_slot):
         """Load player data from the database or create a new player."""
-        response = supabase.table('player_saves').select('*').eq('user_id', user_id).eq('save_slot', save_slot).execute()
-        if response.data:
-            player_save = response.data[0]
-            return cls(
-                name=player_save['name'],
-                player_class=player_save['player_class'],
-                level=player_save['level'],
-                experience=player_save['experience'],
-                health=player_save['health'],
-                max_health=player_save['max_health'],
-                defense=player_save['defense'],
-                inventory=json.loads(player_save['inventory']),
-                skills=json.loads(player_save['skills']),
-                dungeon_floor=player_save['dungeon_floor'],
-                player_location=str(player_save['player_location']).strip('"'),
-                save_slot=player_save['save_slot']
-            )
+        player_save = get_storage().get_player_save(user_id, save_slot)
+        if player_save:
+            return cls.from_record(player_save)
         return None
 
-    @staticmethod
-    def normalize_inventory(inventory):
-        """Normalize inventory keys so saves and loot drops share one shape."""
-        if inventory is None:
-            return {
-                'gold': 5,
-                'health potion': 3,
-                'equipment': [],
-                'equipped': {'weapon': None, 'armor': None},
-            }
-
-        normalized = dict(inventory)
-        legacy_potions = normalized.pop('health_potions', 0)
-        normalized['gold'] = int(normalized.get('gold', 0))
-        normalized['health potion'] = int(normalized.get('health potion', 0)) + int(legacy_potions)
-
-        equipment = normalized.get('equipment', [])
-        normalized['equipment'] = [
-            item['name'] if isinstance(item, dict) and 'name' in item else item
-            for item in equipment
-        ]
-
-        equipped = normalized.get('equipped') or {}
-        if isinstance(equipped, list):
-            equipped = {'weapon': equipped[0] if equipped else None, 'armor': equipped[1] if len(equipped) > 1 else None}
-
-        normalized['equipped'] = {
-            'weapon': equipped.get('weapon'),
-            'armor': equipped.get('armor'),
-        }
-
-        for slot, item_name in list(normalized['equipped'].items()):
-            if item_name not in normalized['equipment']:
-                normalized['equipped'][slot] = None
-
-        return normalized
+    @classmethod
+    def from_record(cls, player_save):
+        """Build a player from a player_saves row."""
+        player = cls(
+            name=player_save['name'],
+            player_class=player_save['player_class'],
+            level=player_save['level'],
+            experience=player_save['experience'],
+            health=player_save['health'],
+            max_health=player_save['max_health'],
+            defense=player_save['defense'],
+            inventory=json.loads(player_save['inventory']),
+            skills=json.loads(player_save['skills']),
+            dungeon_floor=player_save['dungeon_floor'],
+            player_location=str(player_save['player_location']).strip('"'),
+            save_slot=player_save['save_slot']
+        )
+        player.record_version = player_save.get('version') or 0
+        player.mark_saved()
+        return player
 
     @staticmethod
-    def load_loot_data(filename=LOOT):
-        return load_json_file(filename)
+    def get_item_data(item_name):
+        """Return a copy of an item's loot table entry, or None if no item has that name."""
+        item = get_game_data().item(item_name)
+        return item.to_dict() if item else None
 
-    @classmethod
-    def get_item_data(cls, item_name, filename=LOOT):
-        loot_data = cls.load_loot_data(filename)
-        for category in ('gear', 'items'):
-            for item_list in loot_data[category].values():
-                for item in item_list:
-                    if item['name'] == item_name:
-                        return dict(item)
-        return None
-
-    @classmethod
-    def classify_equipment(cls, item_name, filename=LOOT):
-        item_data = cls.get_item_data(item_name, filename)
-        if not item_data:
-            return None
-        attack = item_data.get('attack', 0)
-        defense = item_data.get('defense', 0)
-        return 'weapon' if attack >= defense else 'armor'
+    @staticmethod
+    def classify_equipment(item_name):
+        item = get_game_data().item(item_name)
+        return item.slot if item else None
 
     def get_equipment_bonuses(self):
         bonuses = {'attack': 0, 'defense': 0}
-        for item_name in self.inventory.get('equipped', {}).values():
-            if not item_name:
-                continue
-            item_data = self.get_item_data(item_name)
-            if not item_data:
+        game_data = get_game_data()
+        for item_name in self.inventory.equipped.values():
+            item = game_data.item(item_name) if item_name else None
+            if not item:
                 continue
-            bonuses['attack'] += int(item_data.get('attack', 0))
-            bonuses['defense'] += int(item_data.get('defense', 0))
+            bonuses['attack'] += item.attack or 0
+            bonuses['defense'] += item.defense or 0
         return bonuses
 
+    def view(self):
+        """Return the cached PlayerView, building it if the inventory changed since the last call."""
+        if self._view is None or self._view.version != self.inventory.version:
+            self._view = PlayerView(self)
+        return self._view
+
     def refresh_combat_stats(self):
-        bonuses = self.get_equipment_bonuses()
+        bonuses = self.view().bonuses
         self.defense = self.base_defense + bonuses['defense']
         return bonuses
 
     def get_attack_bonus(self):
-        return self.get_equipment_bonuses()['attack']
+        return self.view().attack_bonus
 
     def get_equipment_details(self):
         details = []
-        equipped = self.inventory.get('equipped', {})
-        for item_name in self.inventory.get('equipment', []):
-            item_data = self.get_item_data(item_name) or {'name': item_name}
-            slot = self.classify_equipment(item_name) or 'gear'
+        game_data = get_game_data()
+        equipped = self.inventory.equipped
+        for item_name in self.inventory.equipment:
+            item = game_data.item(item_name)
+            slot = item.slot if item else 'gear'
             details.append({
                 'name': item_name,
-                'attack': int(item_data.get('attack', 0)),
-                'defense': int(item_data.get('defense', 0)),
-                'value': int(item_data.get('value', 0)),
+                'attack': (item.attack or 0) if item else 0,
+                'defense': (item.defense or 0) if item else 0,
+                'value': item.value if item else 0,
                 'slot': slot,
                 'equipped': equipped.get(slot) == item_name,
             })
@@ -147,34 +175,36 @@ class Player():
 
     def get_equipped_loadout(self):
         loadout = {}
-        for slot in ('weapon', 'armor'):
-            item_name = self.inventory.get('equipped', {}).get(slot)
-            item_data = self.get_item_data(item_name) if item_name else None
+        game_data = get_game_data()
+        for slot in EQUIPMENT_SLOTS:
+            item_name = self.inventory.equipped_in(slot)
+            item = game_data.item(item_name) if item_name else None
             loadout[slot] = {
                 'name': item_name,
-                'attack': int(item_data.get('attack', 0)) if item_data else 0,
-                'defense': int(item_data.get('defense', 0)) if item_data else 0,
+                'attack': (item.attack or 0) if item else 0,
+                'defense': (item.defense or 0) if item else 0,
             }
         return loadout
 
     def get_inventory_items(self):
         items = []
-        for item_name, quantity in self.inventory.items():
-            if item_name in ('equipment', 'equipped', 'gold') or not isinstance(quantity, int) or quantity <= 0:
+        game_data = get_game_data()
+        for item_name, quantity in self.inventory.stacks.items():
+            if item_name == 'gold' or quantity <= 0:
                 continue
 
-            item_data = self.get_item_data(item_name) or {'value': 0}
+            item = game_data.item(item_name)
             items.append({
                 'name': item_name,
                 'quantity': quantity,
-                'value': int(item_data.get('value', 0)),
+                'value': item.value if item else 0,
                 'usable': item_name == 'health potion',
                 'sellable': item_name != 'gold',
             })
         return items
 
     def toggle_equipment(self, item_name):
-        if item_name not in self.inventory['equipment']:
+        if not self.inventory.has_equipment(item_name):
             return {
                 'success': False,
                 'message': "You don't own that equipment.",
@@ -187,16 +217,16 @@ class Player():
                 'message': 'That item cannot be equipped.',
             }
 
-        equipped_item = self.inventory['equipped'].get(slot)
+        equipped_item = self.inventory.equipped_in(slot)
         if equipped_item == item_name:
-            self.inventory['equipped'][slot] = None
+            self.inventory.equip(slot, None)
             self.refresh_combat_stats()
             return {
                 'success': True,
                 'message': f'You unequipped {item_name}.',
             }
 
-        self.inventory['equipped'][slot] = item_name
+        self.inventory.equip(slot, item_name)
         self.refresh_combat_stats()
         if equipped_item:
             return {
@@ -208,51 +238,77 @@ class Player():
             'message': f'You equipped {item_name}.',
         }
 
+    def version_record(self, user_id: int, save_slot: int):
+        """Build a player_saves row holding only the keys and the next version."""
+        return {'user_id': user_id, 'save_slot': save_slot, 'version': self.record_version + 1}
+
+    def to_record(self, user_id: int, save_slot: int):
+        """Build the player_saves row for this player."""
+        record = self.version_record(user_id, save_slot)
+        for column in RECORD_COLUMNS.values():
+            record[column] = self._column_value(column)
+        return record
+
+    def changed_fields(self):
+        """Return the player_saves columns changed since the player was loaded or last saved."""
+        changed = {RECORD_COLUMNS[name] for name in self._changed_fields}
+        if self.inventory.version != self._saved_inventory_version:
+            changed.add('inventory')
+        return changed
+
+    def to_changes(self, user_id: int, save_slot: int):
+        """
+        Build a player_saves row holding only the changed columns.
+
+        Returns:
+            dict: The full row for a player that was never saved, the row keys and
+                  next version plus the changed columns otherwise, or None if
+                  nothing changed.
+        """
+        if not self._record_saved:
+            return self.to_record(user_id, save_slot)
+
+        changed = self.changed_fields()
+        if not changed:
+            return None
+        record = self.version_record(user_id, save_slot)
+        for column in changed:
+            record[column] = self._column_value(column)
+        return record
+
+    def _column_value(self, column):
+        if column == 'defense':
+            return self.base_defense
+        if column == 'inventory':
+            return json.dumps(self.inventory.to_data())
+        if column == 'skills':
+            return json.dumps(self.skills)
+        if column == 'player_location':
+            return str(self.player_location)
+        return getattr(self, column)
+
+    def mark_saved(self, version=None):
+        """Record that storage now matches this player, at version when one was just written."""
+        if version is not None:
+            self.record_version = version
+        self._record_saved = True
+        self._changed_fields.clear()
+        self._saved_inventory_version = self.inventory.version
+
     def save_player_data(self, user_id: int, save_slot: int):
-        """Save player data to the database."""
+        """Save the changed player columns to the database; an unchanged player writes nothing."""
         target_save_slot = self.save_slot if self.save_slot is not None else save_slot
         self.save_slot = target_save_slot
 
-        response = supabase.table('player_saves').select('*').eq('user_id', user_id).eq('save_slot', target_save_slot).execute()
-        if not response.data:
-            # Create a new PlayerSave entry
-            supabase.table('player_saves').insert({
-                'user_id': user_id,
-                'name': self.name,
-                'player_class': self.player_class,
-                'level': self.level,
-                'experience': self.experience,
-                'health': self.health,
-                'max_health': self.max_health,
-                'defense': self.base_defense,
-                'inventory': json.dumps(self.inventory),
-                'skills': json.dumps(self.skills),
-                'dungeon_floor': self.dungeon_floor,
-                'player_location': str(self.player_location),
-                'save_slot': target_save_slot
-            }).execute()
-        else:
-            # Update existing PlayerSave entry
-            supabase.table('player_saves').update({
-                'name': self.name,
-                'player_class': self.player_class,
-                'level': self.level,
-                'experience': self.experience,
-                'health': self.health,
-                'max_health': self.max_health,
-                'defense': self.base_defense,
-                'inventory': json.dumps(self.inventory),
-                'skills': json.dumps(self.skills),
-                'dungeon_floor': self.dungeon_floor,
-                'player_location': str(self.player_location),
-                'save_slot': target_save_slot
-            }).eq('user_id', user_id).eq('save_slot', target_save_slot).execute()
+        record = self.to_changes(user_id, target_save_slot)
+        if record is not None:
+            get_storage().save_player(record)
+            self.mark_saved(record['version'])
 
     def load_skills(self, player_class: str):
         """Returns skills based off of player class."""
         try:
-            skill_data = load_json_file(CLASS_SKILLS)
-            return skill_data.get(player_class, [])
+            return [skill.to_dict() for skill in get_game_data().skills_for_class(player_class)]
         except FileNotFoundError:
             print('Class skills file not found.')
             return []
@@ -264,56 +320,27 @@ class Player():
 
         if isinstance(item, dict):
             item_name = item.get('name')
-            if (
-                not item_name
-                or len(self.inventory['equipment']) >= 5
-                or item_name in self.inventory['equipment']
-            ):
-                return False
-            self.inventory['equipment'].append(item_name)
-            return True
-
-        if item in self.inventory and isinstance(self.inventory[item], int):
-            self.inventory[item] += amount
-            return True
-
-        if item == 'equipment':
-            return False
+            return bool(item_name) and self.inventory.add_equipment(item_name)
 
-        self.inventory[item] = max(amount, 0)
+        self.inventory.add_stack(item, amount)
         return True
         
     def remove_item_from_inventory(self, item: str, amount: int = 1):
         """Removes a given amount of an item from the inventory."""
-        if item in self.inventory and isinstance(self.inventory[item], int):
-            if self.inventory[item] >= amount:
-                self.inventory[item] -= amount
-                return True
-            else:
-                return False
-        elif item in self.inventory['equipment']:
-            self.inventory['equipment'].remove(item)
-            for slot, equipped_item in list(self.inventory['equipped'].items()):
-                if equipped_item == item:
-                    self.inventory['equipped'][slot] = None
+        if item in self.inventory.stacks:
+            return self.inventory.remove_stack(item, amount)
+        if self.inventory.remove_equipment(item):
             self.refresh_combat_stats()
             return True
         return False
     
     def has_item(self, item: str, amount: int = 1):
         """Check if the player has at least a certain amount of an item."""
-        if item in self.inventory:
-            return self.inventory[item] >= amount
-        elif item in self.inventory['equipment']:
-            return True
-        return False
+        return self.inventory.has(item, amount)
 
     def get_inventory(self):
         """Returns a dict summarizing all inventory items."""
-        summary = {k: v for k, v in self.inventory.items() if k not in ('equipment', 'equipped')}
-        summary['equipment'] = [item for item in self.inventory['equipment']]
-        summary['equipped'] = dict(self.inventory['equipped'])
-        return summary
+        return self.inventory.to_summary()
 
     def collect_loot(self, loot):
         """Add enemy loot to the inventory and return a readable summary."""
@@ -389,9 +416,8 @@ class Player():
     
     def heal(self):
         """Heal the player if they have health potions."""
-        if self.inventory.get('health potion', 0) > 0:
+        if self.remove_item_from_inventory('health potion'):
             self.health = min(self.health + 5, self.max_health)
-            self.inventory['health potion'] -= 1
             return True
         return False
     
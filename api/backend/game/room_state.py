@@ -0,0 +1,167 @@
+from backend.game.enemy import Enemy
+from backend.game.game_data import get_game_data
+
+# A room state with these keys at its top level is a legacy flat enemy dict.
+LEGACY_ENEMY_FIELDS = ('name', 'health', 'max_health', 'defense', 'skills')
+
+
+class EnemyState():
+    """
+    The saved state of the enemy in a room.
+
+    Enemies placed from the data files keep only a template reference (tier
+    and name) plus their current health and rolled loot; max health, defense
+    and skills are read from the GameData registry. Enemies saved before
+    templates were referenced have no tier and carry their stats inline.
+    """
+
+    __slots__ = ('name', 'tier', 'health', 'loot', '_max_health', '_defense', '_skills')
+
+    def __init__(self, name, health, tier=None, loot=None, max_health=None, defense=None, skills=None):
+        self.name = name
+        self.tier = tier
+        self.health = health
+        self.loot = loot  # Rolled when the player first meets the enemy
+        self._max_health = max_health
+        self._defense = defense
+        self._skills = skills
+
+    @property
+    def template(self):
+        return get_game_data().enemies.get(self.tier, {}).get(self.name) if self.tier else None
+
+    @property
+    def max_health(self):
+        return self.template.health if self.tier else self._max_health
+
+    @property
+    def defense(self):
+        return self.template.defense if self.tier else self._defense
+
+    @property
+    def skills(self):
+        return self.template.skill_dicts() if self.tier else self._skills
+
+    @classmethod
+    def from_template(cls, template):
+        """Return a full-health enemy for an EnemyTemplate."""
+        return cls(template.name, template.health, tier=template.tier)
+
+    @classmethod
+    def from_data(cls, data):
+        """Decode a stored enemy; returns None if its template no longer exists."""
+        if 'tier' in data:
+            state = cls(data['name'], data['health'], tier=data['tier'], loot=data.get('loot'))
+            if state.template is None:
+                print(f"Enemy template {data['tier']}/{data['name']} not found; removing the enemy.")
+                return None
+            return state
+
+        return cls(
+            data['name'],
+            data['health'],
+            loot=data.get('loot'),
+            max_health=data['max_health'],
+            defense=data['defense'],
+            skills=data['skills'],
+        )
+
+    @classmethod
+    def from_enemy(cls, enemy):
+        if enemy.tier:
+            return cls(enemy.name, enemy.health, tier=enemy.tier, loot=enemy.loot)
+        return cls(enemy.name, enemy.health, loot=enemy.loot, max_health=enemy.max_health,
+                   defense=enemy.defense, skills=enemy.skills)
+
+    def to_data(self):
+        if self.tier:
+            data = {'tier': self.tier, 'name': self.name, 'health': self.health}
+        else:
+            data = {
+                'name': self.name,
+                'health': self.health,
+                'max_health': self._max_health,
+                'defense': self._defense,
+                'skills': self._skills,
+            }
+        if self.loot is not None:
+            data['loot'] = self.loot
+        return data
+
+    def to_enemy(self, dungeon):
+        """Build the live Enemy, rolling its loot now if none was saved."""
+        return Enemy(self.name, self.health, self.max_health, self.defense, self.skills, dungeon,
+                     loot=self.loot, tier=self.tier)
+
+
+class MerchantState():
+    """The saved state of the merchant in a room."""
+
+    __slots__ = ('inventory', 'gold_amount', 'description')
+
+    def __init__(self, inventory, gold_amount, description=None):
+        self.inventory = inventory
+        self.gold_amount = gold_amount
+        self.description = description
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(data.get('inventory', []), data.get('gold_amount'), data.get('description'))
+
+    def to_data(self):
+        return {
+            'inventory': self.inventory,
+            'gold_amount': self.gold_amount,
+            'description': self.description,
+        }
+
+
+class RoomState():
+    """
+    What occupies a room: an EnemyState, a MerchantState, both or neither.
+
+    Rooms are decoded once when a dungeon loads and encoded once when it is
+    saved; in between, code reads room.enemy and room.merchant directly.
+    """
+
+    __slots__ = ('enemy', 'merchant')
+
+    def __init__(self, enemy=None, merchant=None):
+        self.enemy = enemy
+        self.merchant = merchant
+
+    @classmethod
+    def decode(cls, data):
+        """
+        Build a RoomState from a stored room_enemies value.
+
+        Parameters:
+            data (dict): {'enemy': ..., 'merchant': ...} with either key optional,
+                         a legacy flat enemy dict, or None/{} for an empty room.
+
+        Returns:
+            RoomState: The decoded room.
+        """
+        if not data or not isinstance(data, dict):
+            return cls()
+
+        if 'enemy' in data or 'merchant' in data:
+            enemy = data.get('enemy')
+            merchant = data.get('merchant')
+            return cls(
+                EnemyState.from_data(enemy) if enemy else None,
+                MerchantState.from_data(merchant) if merchant else None,
+            )
+
+        if all(field in data for field in LEGACY_ENEMY_FIELDS):
+            return cls(EnemyState.from_data(data))
+
+        return cls()
+
+    def encode(self):
+        data = {}
+        if self.enemy:
+            data['enemy'] = self.enemy.to_data()
+        if self.merchant:
+            data['merchant'] = self.merchant.to_data()
+        return data
@@ -0,0 +1,293 @@
+-- Atomic single round trip persistence for persist_game_state.
+-- Run once in the Supabase SQL editor.
+
+create unique index if not exists player_saves_user_id_save_slot_key
+    on player_saves (user_id, save_slot);
+
+create unique index if not exists dungeons_user_id_save_slot_key
+    on dungeons (user_id, save_slot);
+
+-- Seeded dungeons store the generation seed and per-room deltas instead of
+-- the full layout, which is regenerated on load.
+-- Bumped on every save so a stale writer cannot overwrite a newer save.
+alter table player_saves add column if not exists version integer;
+-- With EVENT_LOG the row's other columns are a snapshot as of this version.
+alter table player_saves add column if not exists snapshot_version integer;
+
+alter table dungeons add column if not exists seed bigint;
+alter table dungeons add column if not exists layout_version integer;
+alter table dungeons alter column room_positions drop not null;
+alter table dungeons alter column connections drop not null;
+alter table dungeons alter column start_location drop not null;
+alter table dungeons alter column exit_location drop not null;
+
+-- DUNGEON_PERSISTENCE=rooms keeps each changed room in its own row, so an
+-- action writes only the rooms it touched. A NULL column means the room's
+-- entry is unchanged from the dungeons row; the JSON text 'null' removes it.
+create table if not exists dungeon_rooms (
+    id bigserial primary key,
+    player_save_id bigint references player_saves (id) on delete cascade,
+    user_id bigint not null,
+    save_slot integer not null,
+    room_id integer not null,
+    room_enemies text,
+    room_descriptions text,
+    room_enemy_descriptions text,
+    unique (user_id, save_slot, room_id)
+);
+
+-- EVENT_LOG appends one row per save: the action, the player columns it
+-- changed and its room records shaped like dungeon_rooms rows, as JSON text.
+-- A snapshot deletes the events it covers.
+create table if not exists game_events (
+    id bigserial primary key,
+    player_save_id bigint references player_saves (id) on delete cascade,
+    user_id bigint not null,
+    save_slot integer not null,
+    version integer not null,
+    event text not null,
+    details text,
+    player text,
+    rooms text,
+    created_at timestamptz not null default now(),
+    unique (user_id, save_slot, version)
+);
+
+-- p_player may hold only the columns that changed (always with user_id and
+-- save_slot); columns it leaves out keep their stored value, and a record
+-- with only its keys writes nothing. A record with a version is only written
+-- if the stored version is its base_version (version - 1 unless given, 0 for
+-- a new save); otherwise the call fails with serialization_failure and the
+-- whole transaction rolls back.
+--
+-- Partial records are applied with an UPDATE: an INSERT ... ON CONFLICT would
+-- fill the omitted columns of its proposed row with NULL, and Postgres checks
+-- NOT NULL constraints on that row before resolving the conflict. Only a full
+-- record, a new save, is inserted. A partial record for a save that does not
+-- exist writes nothing and returns NULL.
+create or replace function upsert_player_save(p_player jsonb)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_player_save_id bigint;
+    v_row player_saves;
+    v_base_version integer;
+begin
+    if (p_player - 'user_id' - 'save_slot') = '{}'::jsonb then
+        select id into v_player_save_id
+        from player_saves
+        where user_id = (p_player ->> 'user_id')::bigint
+          and save_slot = (p_player ->> 'save_slot')::integer;
+        return v_player_save_id;
+    end if;
+
+    v_row := jsonb_populate_record(null::player_saves, p_player);
+    v_base_version := coalesce((p_player ->> 'base_version')::integer, v_row.version - 1);
+
+    update player_saves as p set
+        name = case when p_player ? 'name' then v_row.name else p.name end,
+        player_class = case when p_player ? 'player_class' then v_row.player_class else p.player_class end,
+        level = case when p_player ? 'level' then v_row.level else p.level end,
+        experience = case when p_player ? 'experience' then v_row.experience else p.experience end,
+        health = case when p_player ? 'health' then v_row.health else p.health end,
+        max_health = case when p_player ? 'max_health' then v_row.max_health else p.max_health end,
+        defense = case when p_player ? 'defense' then v_row.defense else p.defense end,
+        inventory = case when p_player ? 'inventory' then v_row.inventory else p.inventory end,
+        skills = case when p_player ? 'skills' then v_row.skills else p.skills end,
+        dungeon_floor = case when p_player ? 'dungeon_floor' then v_row.dungeon_floor else p.dungeon_floor end,
+        player_location = case when p_player ? 'player_location' then v_row.player_location else p.player_location end,
+        version = case when p_player ? 'version' then v_row.version else p.version end,
+        snapshot_version = case when p_player ? 'snapshot_version' then v_row.snapshot_version else p.snapshot_version end
+    where p.user_id = v_row.user_id
+      and p.save_slot = v_row.save_slot
+      and (v_row.version is null or v_base_version = 0 or coalesce(p.version, 0) = v_base_version)
+    returning p.id into v_player_save_id;
+
+    if v_player_save_id is not null then
+        return v_player_save_id;
+    end if;
+
+    if exists (
+        select 1 from player_saves where user_id = v_row.user_id and save_slot = v_row.save_slot
+    ) then
+        raise exception 'stale save for user % slot %', p_player ->> 'user_id', p_player ->> 'save_slot'
+            using errcode = 'serialization_failure';
+    end if;
+
+    if not p_player ?& array[
+        'name', 'player_class', 'level', 'experience', 'health', 'max_health',
+        'defense', 'inventory', 'skills', 'dungeon_floor', 'player_location'
+    ] then
+        -- A partial record for a save that does not exist.
+        return null;
+    end if;
+
+    insert into player_saves (
+        user_id, name, player_class, level, experience, health, max_health,
+        defense, inventory, skills, dungeon_floor, player_location, save_slot, version,
+        snapshot_version
+    )
+    values (
+        v_row.user_id, v_row.name, v_row.player_class, v_row.level, v_row.experience, v_row.health,
+        v_row.max_health, v_row.defense, v_row.inventory, v_row.skills, v_row.dungeon_floor,
+        v_row.player_location, v_row.save_slot, v_row.version, v_row.snapshot_version
+    )
+    on conflict (user_id, save_slot) do nothing
+    returning id into v_player_save_id;
+
+    if v_player_save_id is null then
+        -- Another writer created the save first.
+        raise exception 'stale save for user % slot %', p_player ->> 'user_id', p_player ->> 'save_slot'
+            using errcode = 'serialization_failure';
+    end if;
+
+    return v_player_save_id;
+end;
+$$;
+
+create or replace function save_game_state(p_player jsonb, p_dungeon jsonb)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_player_save_id bigint;
+begin
+    v_player_save_id := upsert_player_save(p_player);
+    if v_player_save_id is null then
+        return null;
+    end if;
+
+    insert into dungeons (
+        player_save_id, user_id, width, height, num_rooms, room_positions,
+        connections, start_location, exit_location, merchant_location,
+        floor_level, save_slot, room_descriptions, room_enemies,
+        room_enemy_descriptions, seed, layout_version
+    )
+    select
+        v_player_save_id, user_id, width, height, num_rooms, room_positions,
+        connections, start_location, exit_location, merchant_location,
+        floor_level, save_slot, room_descriptions, room_enemies,
+        room_enemy_descriptions, seed, layout_version
+    from jsonb_populate_record(null::dungeons, p_dungeon)
+    on conflict (user_id, save_slot) do update set
+        player_save_id = excluded.player_save_id,
+        width = excluded.width,
+        height = excluded.height,
+        num_rooms = excluded.num_rooms,
+        room_positions = excluded.room_positions,
+        connections = excluded.connections,
+        start_location = excluded.start_location,
+        exit_location = excluded.exit_location,
+        merchant_location = excluded.merchant_location,
+        floor_level = excluded.floor_level,
+        room_descriptions = excluded.room_descriptions,
+        room_enemies = excluded.room_enemies,
+        room_enemy_descriptions = excluded.room_enemy_descriptions,
+        seed = excluded.seed,
+        layout_version = excluded.layout_version;
+
+    return v_player_save_id;
+end;
+$$;
+
+create or replace function save_game_rooms(p_player jsonb, p_dungeon jsonb, p_rooms jsonb)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_player_save_id bigint;
+begin
+    if p_dungeon is null or p_dungeon = 'null'::jsonb then
+        v_player_save_id := upsert_player_save(p_player);
+    else
+        -- A new floor: write the whole dungeons row and drop the old floor's rooms.
+        v_player_save_id := save_game_state(p_player, p_dungeon);
+        delete from dungeon_rooms
+        where user_id = (p_dungeon ->> 'user_id')::bigint
+          and save_slot = (p_dungeon ->> 'save_slot')::integer;
+    end if;
+
+    if v_player_save_id is null then
+        -- Nothing to attach the rows to.
+        return null;
+    end if;
+
+    -- Each room record carries only its changed columns; absent keys keep
+    -- the stored value.
+    insert into dungeon_rooms as r (
+        player_save_id, user_id, save_slot, room_id,
+        room_enemies, room_descriptions, room_enemy_descriptions
+    )
+    select
+        v_player_save_id,
+        (room ->> 'user_id')::bigint,
+        (room ->> 'save_slot')::integer,
+        (room ->> 'room_id')::integer,
+        room ->> 'room_enemies',
+        room ->> 'room_descriptions',
+        room ->> 'room_enemy_descriptions'
+    from jsonb_array_elements(coalesce(p_rooms, '[]'::jsonb)) as room
+    on conflict (user_id, save_slot, room_id) do update set
+        player_save_id = excluded.player_save_id,
+        room_enemies = coalesce(excluded.room_enemies, r.room_enemies),
+        room_descriptions = coalesce(excluded.room_descriptions, r.room_descriptions),
+        room_enemy_descriptions = coalesce(excluded.room_enemy_descriptions, r.room_enemy_descriptions);
+
+    return v_player_save_id;
+end;
+$$;
+
+create or replace function save_game_events(p_player jsonb, p_dungeon jsonb, p_events jsonb)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_player_save_id bigint;
+begin
+    if p_dungeon is null or p_dungeon = 'null'::jsonb then
+        v_player_save_id := upsert_player_save(p_player);
+    else
+        -- A snapshot of a new floor: write the whole dungeons row.
+        v_player_save_id := save_game_state(p_player, p_dungeon);
+        delete from dungeon_rooms
+        where user_id = (p_dungeon ->> 'user_id')::bigint
+          and save_slot = (p_dungeon ->> 'save_slot')::integer;
+    end if;
+
+    if v_player_save_id is null then
+        -- Nothing to attach the rows to.
+        return null;
+    end if;
+
+    insert into game_events as e (
+        player_save_id, user_id, save_slot, version, event, details, player, rooms
+    )
+    select
+        v_player_save_id,
+        (event ->> 'user_id')::bigint,
+        (event ->> 'save_slot')::integer,
+        (event ->> 'version')::integer,
+        event ->> 'event',
+        event ->> 'details',
+        event ->> 'player',
+        event ->> 'rooms'
+    from jsonb_array_elements(coalesce(p_events, '[]'::jsonb)) as event
+    on conflict (user_id, save_slot, version) do update set
+        player_save_id = excluded.player_save_id,
+        event = excluded.event,
+        details = excluded.details,
+        player = excluded.player,
+        rooms = excluded.rooms;
+
+    -- A snapshot replaces the events it covers.
+    if p_player ? 'snapshot_version' then
+        delete from game_events
+        where user_id = (p_player ->> 'user_id')::bigint
+          and save_slot = (p_player ->> 'save_slot')::integer
+          and version <= (p_player ->> 'snapshot_version')::integer;
+    end if;
+
+    return v_player_save_id;
+end;
+$$;
@@ -0,0 +1,74 @@
+"""
+Record Dungeon.generate() time as floors grow.
+
+Run from the api directory:
+    python benchmarks/generation_scaling.py
+    python benchmarks/generation_scaling.py --sizes 10 100 1000 --repeat 5 --output scaling.json
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from backend.game.dungeon import Dungeon
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+
+
+def grid_side(num_rooms: int) -> int:
+    """Square grid with roughly twice as many cells as rooms, so every room fits."""
+    return max(3, math.ceil(math.sqrt(num_rooms * 2)))
+
+
+def time_generation(num_rooms: int, repeat: int, floor_level: int = 1):
+    side = grid_side(num_rooms)
+    timings = []
+    for seed in range(repeat):
+        dungeon = Dungeon(side, side, num_rooms, floor_level, seed=seed)
+        started = time.perf_counter()
+        dungeon.generate()
+        timings.append(time.perf_counter() - started)
+    return {
+        'num_rooms': num_rooms,
+        'grid': f"{side}x{side}",
+        'rooms_generated': len(dungeon.room_positions),
+        'best_seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    args = parser.parse_args(argv)
+
+    # Load and cache the JSON data files so the first size is not charged for them.
+    time_generation(10, 1)
+
+    results = []
+    print(f"{'rooms':>8}  {'grid':>9}  {'best (ms)':>10}  {'median (ms)':>11}  {'us/room':>8}")
+    for num_rooms in args.sizes:
+        result = time_generation(num_rooms, args.repeat)
+        results.append(result)
+        print(
+            f"{result['num_rooms']:>8}  {result['grid']:>9}  {result['best_seconds'] * 1000:>10.2f}  "
+            f"{result['median_seconds'] * 1000:>11.2f}  {result['best_seconds'] / num_rooms * 1e6:>8.1f}"
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,9 +6,14 @@ API_DIR = os.path.abspath(os.path.dirname(__file__))
 if API_DIR not in sys.path:
     sys.path.insert(0, API_DIR)
 
-from backend.app import create_app
+from backend.app.startup import startup_profiler
 
-app = create_app()
+with startup_profiler.track_imports():
+    from backend.app import create_app
+
+    app = create_app()
+
+startup_profiler.emit()
 
 if __name__ == "__main__":
     debug_enabled = os.getenv("FLASK_DEBUG", "").strip().lower() in {"1", "true", "yes", "on"}